@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from accounts.metrics import refresh_metrics
+
+
+class Command(BaseCommand):
+    help = 'Recount every dashboard counter (schedule this to correct drift)'
+
+    def handle(self, *args, **options):
+        count = refresh_metrics()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {count} dashboard metrics'))
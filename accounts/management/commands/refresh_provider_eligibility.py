@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from accounts.models import ServiceProviderProfile
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored is_eligible_for_requests flag of every service provider'
+
+    def handle(self, *args, **options):
+        updated = ServiceProviderProfile.refresh_eligibility()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed eligibility for {updated} providers'))
@@ -0,0 +1,86 @@
+"""Precomputed dashboard counters"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from .models import DashboardMetric, ServiceProviderProfile, User
+
+PROVIDER_PENDING_COMMISSIONS = 'pending_commissions:{provider_id}'
+
+
+def _pending_commissions(provider_id):
+    from payments.models import Commission
+    return Commission.objects.filter(service_provider_id=provider_id, status='pending').count()
+
+
+GLOBAL_METRICS = {
+    'total_customers': lambda: User.objects.filter(user_type='customer').count(),
+    'total_providers': lambda: User.objects.filter(user_type='service_provider').count(),
+    'pending_approvals': lambda: ServiceProviderProfile.objects.filter(is_approved=False).count(),
+}
+
+
+def provider_pending_commissions_key(provider_id):
+    return PROVIDER_PENDING_COMMISSIONS.format(provider_id=provider_id)
+
+
+def live_count(key):
+    if key in GLOBAL_METRICS:
+        return GLOBAL_METRICS[key]()
+    name, _, provider_id = key.partition(':')
+    if name == 'pending_commissions':
+        return _pending_commissions(int(provider_id))
+    raise KeyError(key)
+
+
+def max_age():
+    return timedelta(seconds=getattr(settings, 'DASHBOARD_METRICS_MAX_AGE', 3600))
+
+
+def store_metric(key, value):
+    DashboardMetric.objects.update_or_create(key=key, defaults={'value': value, 'refreshed_at': timezone.now()})
+
+
+def get_metrics(keys):
+    """
+    Return {key: value} read from the rollup. Missing or stale counters are
+    recounted live and stored.
+    """
+    cutoff = timezone.now() - max_age()
+    stored = {
+        metric.key: metric
+        for metric in DashboardMetric.objects.filter(key__in=keys)
+    }
+    values = {}
+    for key in keys:
+        metric = stored.get(key)
+        if metric is None or metric.refreshed_at < cutoff:
+            values[key] = live_count(key)
+            store_metric(key, values[key])
+        else:
+            values[key] = metric.value
+    return values
+
+
+def get_metric(key):
+    return get_metrics([key])[key]
+
+
+def adjust_metric(key, delta):
+    """Apply delta to a stored counter; a counter that was never read stays absent"""
+    if key and delta:
+        DashboardMetric.objects.filter(key=key).update(value=F('value') + delta)
+
+
+def refresh_metrics():
+    """Recount every stored counter and the global ones"""
+    keys = set(GLOBAL_METRICS) | set(DashboardMetric.objects.values_list('key', flat=True))
+    for key in keys:
+        try:
+            value = live_count(key)
+        except (KeyError, ValueError):
+            DashboardMetric.objects.filter(key=key).delete()
+            continue
+        store_metric(key, value)
+    return len(keys)
@@ -1,6 +1,9 @@
 from django.contrib.auth.models import AbstractUser
+from django.conf import settings
 from django.db import models
+from django.db.models import ExpressionWrapper, Q
 from django.core.validators import RegexValidator
+from services.spatial import encode_geohash
 
 class User(AbstractUser):
     USER_TYPES = (
@@ -18,14 +21,31 @@ class User(AbstractUser):
     address = models.TextField(blank=True)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     is_verified = models.BooleanField(default=False)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['latitude', 'longitude']),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.get_user_type_display()})"
 
+    def save(self, *args, **kwargs):
+        # Keep the spatial index key in step with the coordinates
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(float(self.latitude), float(self.longitude))
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+
 class CustomerProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='customer_profile')
     emergency_contact = models.CharField(max_length=15, blank=True)
@@ -81,10 +101,63 @@ class ServiceProviderProfile(models.Model):
     total_unpaid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
     total_reviews = models.IntegerField(default=0)
+    # Running sums and counts of approved reviews, maintained by reviews.ratings
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    quality_rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    quality_rating_count = models.PositiveIntegerField(default=0, editable=False)
+    timeliness_rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    timeliness_rating_count = models.PositiveIntegerField(default=0, editable=False)
+    professionalism_rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    professionalism_rating_count = models.PositiveIntegerField(default=0, editable=False)
+    value_rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    value_rating_count = models.PositiveIntegerField(default=0, editable=False)
+    # Bayesian, time-decayed review score refreshed in batch by reviews.ranking
+    ranking_score = models.FloatField(default=0, db_index=True, editable=False)
+    # Maintained from is_approved, is_active and unpaid_dues_count on save
+    is_eligible_for_requests = models.BooleanField(default=False, db_index=True, editable=False)
     
     def __str__(self):
         return f"{self.business_name} ({self.get_provider_type_display()})"
     
-    @property
-    def is_eligible_for_requests(self):
-        return self.is_approved and self.is_active and self.unpaid_dues_count < 5
\ No newline at end of file
+    def save(self, *args, **kwargs):
+        self.is_eligible_for_requests = self.compute_eligibility()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'is_eligible_for_requests'}
+        super().save(*args, **kwargs)
+    
+    def compute_eligibility(self):
+        return self.is_approved and self.is_active and self.unpaid_dues_count < settings.MAX_UNPAID_DUES
+    
+    def aspect_averages(self):
+        """Average of each review aspect, None for an aspect nobody rated"""
+        averages = {}
+        for aspect in ('quality', 'timeliness', 'professionalism', 'value'):
+            total = getattr(self, f'{aspect}_rating_sum')
+            count = getattr(self, f'{aspect}_rating_count')
+            averages[f'avg_{aspect}'] = total / count if count else None
+        return averages
+    
+    @staticmethod
+    def eligibility_expression():
+        """SQL form of compute_eligibility, for set-based updates"""
+        return ExpressionWrapper(
+            Q(is_approved=True, is_active=True, unpaid_dues_count__lt=settings.MAX_UNPAID_DUES),
+            output_field=models.BooleanField()
+        )
+    
+    @classmethod
+    def refresh_eligibility(cls, queryset=None):
+        """Recompute the eligibility column for queryset (default: all providers)"""
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(is_eligible_for_requests=cls.eligibility_expression())
+
+class DashboardMetric(models.Model):
+    """Precomputed dashboard counter, maintained by accounts.metrics"""
+    key = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+    # Time of the last full recount; incremental updates leave it alone
+    refreshed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.key} = {self.value}"
\ No newline at end of file
@@ -0,0 +1,93 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from payments.models import Commission
+from .metrics import adjust_metric, provider_pending_commissions_key
+from .models import ServiceProviderProfile, User
+from .snapshots import forget_stored_row, stored_row
+
+USER_TYPE_METRICS = {
+    'customer': 'total_customers',
+    'service_provider': 'total_providers',
+}
+
+
+def _previous(instance, fields, kwargs):
+    """Stored values of fields before this save, or None for new rows and untouched fields"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(fields) & set(update_fields):
+        return None
+    stored = stored_row(instance)
+    if stored is None:
+        return None
+    return {field: getattr(stored, field) for field in fields}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def drop_stored_row(sender, instance, **kwargs):
+    # The next save of this instance reads its stored row afresh
+    forget_stored_row(instance)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_type(sender, instance, **kwargs):
+    instance._previous_metrics = _previous(instance, ['user_type'], kwargs)
+
+
+@receiver(post_save, sender=User)
+def count_user(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_metrics', None)
+    if created:
+        adjust_metric(USER_TYPE_METRICS.get(instance.user_type), 1)
+    elif previous and previous['user_type'] != instance.user_type:
+        adjust_metric(USER_TYPE_METRICS.get(previous['user_type']), -1)
+        adjust_metric(USER_TYPE_METRICS.get(instance.user_type), 1)
+
+
+@receiver(post_delete, sender=User)
+def uncount_user(sender, instance, **kwargs):
+    adjust_metric(USER_TYPE_METRICS.get(instance.user_type), -1)
+
+
+@receiver(pre_save, sender=ServiceProviderProfile)
+def remember_approval(sender, instance, **kwargs):
+    instance._previous_metrics = _previous(instance, ['is_approved'], kwargs)
+
+
+@receiver(post_save, sender=ServiceProviderProfile)
+def count_pending_approval(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_metrics', None)
+    if created:
+        adjust_metric('pending_approvals', 0 if instance.is_approved else 1)
+    elif previous and previous['is_approved'] != instance.is_approved:
+        adjust_metric('pending_approvals', 1 if previous['is_approved'] else -1)
+
+
+@receiver(post_delete, sender=ServiceProviderProfile)
+def uncount_pending_approval(sender, instance, **kwargs):
+    if not instance.is_approved:
+        adjust_metric('pending_approvals', -1)
+
+
+@receiver(pre_save, sender=Commission)
+def remember_commission_status(sender, instance, **kwargs):
+    instance._previous_metrics = _previous(instance, ['status', 'service_provider_id'], kwargs)
+
+
+@receiver(post_save, sender=Commission)
+def count_pending_commission(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_metrics', None)
+    if created:
+        if instance.status == 'pending':
+            adjust_metric(provider_pending_commissions_key(instance.service_provider_id), 1)
+    elif previous:
+        if previous['status'] == 'pending':
+            adjust_metric(provider_pending_commissions_key(previous['service_provider_id']), -1)
+        if instance.status == 'pending':
+            adjust_metric(provider_pending_commissions_key(instance.service_provider_id), 1)
+
+
+@receiver(post_delete, sender=Commission)
+def uncount_pending_commission(sender, instance, **kwargs):
+    if instance.status == 'pending':
+        adjust_metric(provider_pending_commissions_key(instance.service_provider_id), -1)
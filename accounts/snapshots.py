@@ -0,0 +1,20 @@
+"""The stored row of an instance being saved, shared by the pre_save receivers"""
+
+SNAPSHOT_ATTR = '_stored_snapshot'
+
+
+def stored_row(instance):
+    """
+    Return the instance's row as it is stored before the save in progress,
+    or None for a new one. Fetched once per save however many receivers
+    ask; forget_stored_row drops it when the save is done.
+    """
+    if not instance.pk:
+        return None
+    if SNAPSHOT_ATTR not in instance.__dict__:
+        instance.__dict__[SNAPSHOT_ATTR] = type(instance).objects.filter(pk=instance.pk).first()
+    return instance.__dict__[SNAPSHOT_ATTR]
+
+
+def forget_stored_row(instance):
+    instance.__dict__.pop(SNAPSHOT_ATTR, None)
@@ -6,13 +6,16 @@ from django.http import JsonResponse
 from django.template.loader import render_to_string
 from django.core.mail import send_mail
 from django.conf import settings
+from django.utils import timezone
 from django.utils.crypto import get_random_string
 from .models import User, CustomerProfile, ServiceProviderProfile, Vehicle
+from .metrics import get_metric, get_metrics, provider_pending_commissions_key
 from .forms import (
     CustomerRegistrationForm, ServiceProviderRegistrationForm,
     CustomerProfileForm, ServiceProviderProfileForm, VehicleForm
 )
 from bookings.models import ServiceRequest
+from payments.rollups import provider_summary
 from reviews.models import Review
 import json
 
@@ -95,7 +98,9 @@ def dashboard_view(request):
                     status__in=['accepted', 'in_progress']
                 )[:5],
                 'recent_reviews': Review.objects.filter(service_provider=provider_profile)[:5],
-                'unpaid_commissions': provider_profile.commissions.filter(status='pending').count()
+                'unpaid_commissions': get_metric(provider_pending_commissions_key(provider_profile.id)),
+                # Month to date, summed from the daily rollups
+                'month_summary': provider_summary(provider_profile, start=timezone.localdate().replace(day=1)),
             })
         except ServiceProviderProfile.DoesNotExist:
             messages.error(request, 'Service provider profile not found.')
@@ -103,12 +108,9 @@ def dashboard_view(request):
         return render(request, 'accounts/provider_dashboard.html', context)
         
     elif user.user_type == 'admin':
-        context.update({
-            'total_customers': User.objects.filter(user_type='customer').count(),
-            'total_providers': User.objects.filter(user_type='service_provider').count(),
-            'pending_approvals': ServiceProviderProfile.objects.filter(is_approved=False).count(),
-            'recent_requests': ServiceRequest.objects.all()[:10],
-        })
+        # Counters come from the precomputed rollup
+        context.update(get_metrics(['total_customers', 'total_providers', 'pending_approvals']))
+        context['recent_requests'] = ServiceRequest.objects.all()[:10]
         return render(request, 'accounts/admin_dashboard.html', context)
     
     return render(request, 'accounts/dashboard.html', context)
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from bookings.pagination import DEFAULT_KEYSET, InvalidCursor, keyset_paginate
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on (created_at, id), newest first; stays fast on deep pages"""
+    page_size = api_settings.PAGE_SIZE or 20
+    cursor_query_param = 'cursor'
+    fields = DEFAULT_KEYSET
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            self.page = keyset_paginate(
+                queryset, request.query_params.get(self.cursor_query_param),
+                page_size=self.page_size, fields=self.fields
+            )
+        except InvalidCursor:
+            raise NotFound('Invalid cursor')
+        return list(self.page)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.page.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.page.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class MessageHistoryPagination(KeysetPagination):
+    """Chat history, newest first; the next link pages back in time"""
+    page_size = 50
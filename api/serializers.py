@@ -3,6 +3,7 @@ from services.models import Service, ServiceCategory
 from bookings.models import ServiceRequest
 from reviews.models import Review
 from accounts.models import ServiceProviderProfile
+from chat.models import Message
 
 class ServiceCategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,9 +11,7 @@ class ServiceCategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'icon']
 
 class ServiceProviderSerializer(serializers.ModelSerializer):
-    business_name = serializers.CharField(source='service_provider_profile.business_name')
-    provider_type = serializers.CharField(source='service_provider_profile.get_provider_type_display')
-    rating = serializers.DecimalField(source='service_provider_profile.rating', max_digits=3, decimal_places=2)
+    provider_type = serializers.CharField(source='get_provider_type_display')
     
     class Meta:
         model = ServiceProviderProfile
@@ -50,4 +49,10 @@ class ReviewSerializer(serializers.ModelSerializer):
             'professionalism_rating', 'value_rating', 'service_provider_name',
             'customer_name', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']
+
+class MessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Message
+        fields = ['id', 'conversation', 'sender', 'message_type', 'content', 'image',
+                  'latitude', 'longitude', 'is_read', 'created_at']
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+from accounts.models import ServiceProviderProfile, User
+from services.models import Service, ServiceArea, ServiceCategory
+
+# Session, user, providers with their users, services with categories, coverage areas
+NEARBY_QUERIES = 5
+
+
+class NearbyServicesQueryCountTests(TestCase):
+    """The nearby endpoint runs a fixed number of queries however many providers match"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user(username='customer', password='x', user_type='customer')
+        cls.categories = [ServiceCategory.objects.create(name=f'Category {i}') for i in range(3)]
+
+    def setUp(self):
+        caches['nearby'].clear()
+        self.client.force_login(self.customer)
+
+    def add_providers(self, count, start=0):
+        for i in range(start, start + count):
+            user = User.objects.create(
+                username=f'provider{i}', user_type='service_provider',
+                latitude=40.7 + i * 0.001, longitude=-74.0 + i * 0.001,
+            )
+            provider = ServiceProviderProfile.objects.create(
+                user=user, business_name=f'Business {i}', business_license=f'L{i}',
+                provider_type='mechanic', is_approved=True,
+            )
+            for category in self.categories:
+                Service.objects.create(
+                    provider=provider, category=category, name=f'{category.name} service',
+                    base_price=10, estimated_duration=timedelta(hours=1),
+                )
+
+    def fetch(self):
+        caches['nearby'].clear()
+        response = self.client.get(reverse('nearby_services_api'), {'lat': 40.7, 'lng': -74.0, 'radius': 10})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['providers']
+
+    def test_few_providers(self):
+        self.add_providers(2)
+        with self.assertNumQueries(NEARBY_QUERIES):
+            providers = self.fetch()
+        self.assertEqual(len(providers), 2)
+
+    def test_many_providers(self):
+        self.add_providers(25)
+        with self.assertNumQueries(NEARBY_QUERIES):
+            providers = self.fetch()
+        self.assertEqual(len(providers), 25)
+        self.assertTrue(all(len(provider['services']) == 3 for provider in providers))
+
+
+class NearbyServicesCoverageTests(TestCase):
+    """Providers whose service area covers the point are listed even if they live farther away"""
+
+    def setUp(self):
+        caches['nearby'].clear()
+        customer = User.objects.create_user(username='customer', password='x', user_type='customer')
+        self.client.force_login(customer)
+        category = ServiceCategory.objects.create(name='Towing')
+        # 0.135 degrees of latitude is about 15 km
+        user = User.objects.create(
+            username='far', user_type='service_provider', latitude=40.835, longitude=-74.0,
+        )
+        self.provider = ServiceProviderProfile.objects.create(
+            user=user, business_name='Far Towing', business_license='FAR', provider_type='towing', is_approved=True,
+        )
+        Service.objects.create(
+            provider=self.provider, category=category, name='Tow', base_price=80,
+            estimated_duration=timedelta(hours=1),
+        )
+        ServiceArea.objects.create(
+            provider=self.provider, area_name='Home', latitude=40.835, longitude=-74.0, radius_km=20,
+        )
+
+    def test_covering_provider_outside_radius_is_listed(self):
+        response = self.client.get(
+            reverse('nearby_services_api'), {'lat': 40.7, 'lng': -74.0, 'radius': 10, 'order': 'coverage'}
+        )
+        providers = response.json()['providers']
+        self.assertEqual([provider['id'] for provider in providers], [self.provider.id])
+        self.assertTrue(providers[0]['covers_location'])
+        self.assertAlmostEqual(providers[0]['distance'], 15.0, delta=0.1)
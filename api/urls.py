@@ -4,11 +4,13 @@ from . import views
 
 router = DefaultRouter()
 router.register(r'services', views.ServiceViewSet)
-router.register(r'bookings', views.ServiceRequestViewSet)
-router.register(r'reviews', views.ReviewViewSet)
+router.register(r'bookings', views.ServiceRequestViewSet, basename='servicerequest')
+router.register(r'reviews', views.ReviewViewSet, basename='review')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('nearby-services/', views.nearby_services_api, name='nearby_services_api'),
     path('service-categories/', views.service_categories_api, name='service_categories_api'),
+    path('conversations/<int:conversation_id>/messages/', views.conversation_messages_api, name='conversation_messages_api'),
+    path('conversations/<int:conversation_id>/read/', views.conversation_mark_read_api, name='conversation_mark_read_api'),
 ]
\ No newline at end of file
@@ -3,21 +3,25 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.http import JsonResponse
-from geopy.distance import geodesic
+from django.shortcuts import get_object_or_404
 from services.models import Service, ServiceCategory
+from services.cache import cached_nearby_providers
+from services.coverage import annotate_coverage
+from services.nearby import order_results
 from bookings.models import ServiceRequest
 from reviews.models import Review
-from accounts.models import ServiceProviderProfile
 from . import serializers
+from .pagination import KeysetPagination, MessageHistoryPagination
 
 class ServiceViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Service.objects.filter(is_available=True)
+    queryset = Service.objects.filter(is_available=True).select_related('category', 'provider')
     serializer_class = serializers.ServiceSerializer
     permission_classes = [IsAuthenticated]
 
 class ServiceRequestViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.ServiceRequestSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         user = self.request.user
@@ -39,50 +43,60 @@ class ReviewViewSet(viewsets.ModelViewSet):
             return Review.objects.filter(service_provider=user.service_provider_profile)
         return Review.objects.all()
 
+def _nearby_provider_data(provider):
+    return {
+        'id': provider.id,
+        'business_name': provider.business_name,
+        'provider_type': provider.get_provider_type_display(),
+        'rating': float(provider.rating),
+        'score': provider.ranking_score,
+        'latitude': float(provider.user.latitude),
+        'longitude': float(provider.user.longitude),
+        'services': serializers.ServiceSerializer(
+            provider.available_services, many=True
+        ).data
+    }
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def nearby_services_api(request):
     user_lat = request.GET.get('lat')
     user_lng = request.GET.get('lng')
     radius = float(request.GET.get('radius', 10))
+    order = request.GET.get('order', 'distance')  # 'distance', 'coverage', 'score' or 'blend'
     
     if not user_lat or not user_lng:
         return Response({'error': 'Location required'}, status=status.HTTP_400_BAD_REQUEST)
     
     user_lat, user_lng = float(user_lat), float(user_lng)
-    user_location = (user_lat, user_lng)
-    
-    providers = ServiceProviderProfile.objects.filter(
-        is_approved=True,
-        is_active=True,
-        is_eligible_for_requests=True
-    ).exclude(user__latitude__isnull=True, user__longitude__isnull=True)
     
-    nearby_providers = []
-    for provider in providers:
-        provider_location = (float(provider.user.latitude), float(provider.user.longitude))
-        distance = geodesic(user_location, provider_location).kilometers
-        
-        if distance <= radius:
-            provider_data = {
-                'id': provider.id,
-                'business_name': provider.business_name,
-                'provider_type': provider.get_provider_type_display(),
-                'rating': float(provider.rating),
-                'distance': round(distance, 2),
-                'latitude': float(provider.user.latitude),
-                'longitude': float(provider.user.longitude),
-                'services': serializers.ServiceSerializer(
-                    provider.services.filter(is_available=True), many=True
-                ).data
-            }
-            nearby_providers.append(provider_data)
-    
-    nearby_providers.sort(key=lambda x: x['distance'])
+    nearby_providers = cached_nearby_providers('api', user_lat, user_lng, radius, _nearby_provider_data)
+    annotate_coverage(nearby_providers, user_lat, user_lng, _nearby_provider_data)
+    order_results(nearby_providers, order)
     return Response({'providers': nearby_providers})
 
 @api_view(['GET'])
 def service_categories_api(request):
     categories = ServiceCategory.objects.filter(is_active=True)
     data = serializers.ServiceCategorySerializer(categories, many=True).data
-    return Response(data)
\ No newline at end of file
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def conversation_messages_api(request, conversation_id):
+    conversation = get_object_or_404(request.user.conversations, pk=conversation_id)
+    paginator = MessageHistoryPagination()
+    page = paginator.paginate_queryset(conversation.messages.all(), request)
+    data = serializers.MessageSerializer(page, many=True, context={'request': request}).data
+    return paginator.get_paginated_response(data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def conversation_mark_read_api(request, conversation_id):
+    conversation = get_object_or_404(request.user.conversations, pk=conversation_id)
+    try:
+        message = conversation.messages.get(pk=int(request.data.get('up_to')))
+    except (TypeError, ValueError, conversation.messages.model.DoesNotExist):
+        return Response({'error': 'up_to must be a message in this conversation'}, status=status.HTTP_400_BAD_REQUEST)
+    marked = conversation.mark_read_up_to(request.user, message)
+    return Response({'marked_read': marked})
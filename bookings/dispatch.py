@@ -0,0 +1,210 @@
+"""Dispatch of pending service requests to nearby providers in waves"""
+
+from collections import namedtuple
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q
+from django.utils import timezone
+from accounts.models import User
+from services.distance import batch_distances
+from services.models import Service
+from services.nearby import nearby_providers_queryset
+from services.spatial import get_spatial_index
+from .models import DispatchOffer, ServiceRequest
+
+DEFAULT_DISPATCH_POLICY = {'wave_size': 3, 'timeout': 120, 'retry': 300}
+DEFAULT_DISPATCH_WEIGHTS = {'distance': 0.5, 'score': 0.3, 'load': 0.2}
+ACTIVE_STATUSES = ('accepted', 'in_progress')
+
+Candidate = namedtuple('Candidate', ['provider', 'distance', 'load', 'score'])
+
+
+def dispatch_policy(priority):
+    """
+    Wave size, offer timeout and the wait before searching again after a
+    wave found no provider (seconds) for a request priority
+    """
+    policies = getattr(settings, 'DISPATCH_POLICIES', {})
+    return {**DEFAULT_DISPATCH_POLICY, **policies.get(priority, {})}
+
+
+def candidate_providers(service_request, limit=None, exclude=()):
+    """
+    Return up to limit (provider, distance_km) pairs, nearest first, of the
+    eligible providers offering the request's service category. The search
+    radius doubles from DISPATCH_INITIAL_RADIUS_KM until enough are found.
+    """
+    limit = limit or getattr(settings, 'DISPATCH_CANDIDATES', 20)
+    radius = getattr(settings, 'DISPATCH_INITIAL_RADIUS_KM', 5.0)
+    max_radius = getattr(settings, 'DISPATCH_MAX_RADIUS_KM', 50.0)
+    latitude, longitude = float(service_request.pickup_latitude), float(service_request.pickup_longitude)
+
+    offers_category = Service.objects.filter(
+        provider=OuterRef('pk'), category_id=service_request.service.category_id, is_available=True
+    )
+    queryset = nearby_providers_queryset().prefetch_related(None).filter(
+        Exists(offers_category)
+    ).exclude(pk__in=exclude)
+    index = get_spatial_index()
+
+    while True:
+        providers = list(index.filter(queryset, latitude, longitude, radius))
+        distances = batch_distances(
+            (latitude, longitude),
+            [provider.user.latitude for provider in providers],
+            [provider.user.longitude for provider in providers],
+        )
+        found = sorted(
+            ((provider, distance) for provider, distance in zip(providers, distances.tolist()) if distance <= radius),
+            key=lambda item: item[1],
+        )
+        if len(found) >= limit or radius >= max_radius:
+            return found[:limit]
+        radius = min(radius * 2, max_radius)
+
+
+def provider_loads(provider_ids):
+    """Active jobs per provider"""
+    rows = (
+        ServiceRequest.objects.filter(service_provider_id__in=provider_ids, status__in=ACTIVE_STATUSES)
+        .values('service_provider_id').annotate(count=Count('id')).order_by()
+    )
+    return {row['service_provider_id']: row['count'] for row in rows}
+
+
+def rank_candidates(pairs):
+    """
+    Order (provider, distance) pairs best first by a weighted mix of
+    closeness, ranking score and spare capacity. Providers at
+    DISPATCH_MAX_ACTIVE_JOBS are left out.
+    """
+    if not pairs:
+        return []
+    weights = {**DEFAULT_DISPATCH_WEIGHTS, **getattr(settings, 'DISPATCH_WEIGHTS', {})}
+    max_load = getattr(settings, 'DISPATCH_MAX_ACTIVE_JOBS', 3)
+    loads = provider_loads([provider.pk for provider, _ in pairs])
+    farthest = max(distance for _, distance in pairs) or 1.0
+
+    ranked = []
+    for provider, distance in pairs:
+        load = loads.get(provider.pk, 0)
+        if load >= max_load:
+            continue
+        score = (
+            weights['distance'] * (1 - distance / farthest)
+            + weights['score'] * provider.ranking_score / 5
+            + weights['load'] * (1 - load / max_load)
+        )
+        ranked.append(Candidate(provider, distance, load, score))
+    ranked.sort(key=lambda candidate: (-candidate.score, candidate.distance))
+    return ranked
+
+
+def _notify(service_request, provider_ids):
+    from notifications.fanout import fan_out
+    fan_out(
+        User.objects.filter(service_provider_profile__in=provider_ids), 'service_request',
+        f'New {service_request.get_priority_display().lower()} priority request nearby',
+        f'{service_request.service.name}: {service_request.pickup_address}',
+        related_object=service_request,
+    )
+
+
+def offer_next_wave(service_request, now=None, notify=True):
+    """Offer the request to the next best providers not offered it yet; returns the offers"""
+    now = now or timezone.now()
+    policy = dispatch_policy(service_request.priority)
+    with transaction.atomic():
+        # Serialize waves of the same request
+        locked = ServiceRequest.objects.select_for_update().filter(
+            pk=service_request.pk, status='pending', service_provider__isnull=True
+        ).exists()
+        if not locked:
+            return []
+        previous = DispatchOffer.objects.filter(service_request=service_request)
+        wave = (previous.aggregate(wave=Max('wave'))['wave'] or 0) + 1
+        offered = list(previous.values_list('service_provider_id', flat=True))
+
+        ranked = rank_candidates(candidate_providers(service_request, exclude=offered))
+        offers = DispatchOffer.objects.bulk_create([
+            DispatchOffer(
+                service_request=service_request, service_provider=candidate.provider, wave=wave, rank=rank,
+                distance_km=candidate.distance, dispatch_score=candidate.score, offered_at=now,
+                expires_at=now + timedelta(seconds=policy['timeout']),
+            )
+            for rank, candidate in enumerate(ranked[:policy['wave_size']], start=1)
+        ])
+        # Nobody left to offer it to; don't search again on every tick
+        retry_at = None if offers else now + timedelta(seconds=policy['retry'])
+        if retry_at or service_request.next_dispatch_at:
+            ServiceRequest.objects.filter(pk=service_request.pk).update(next_dispatch_at=retry_at)
+            service_request.next_dispatch_at = retry_at
+    if offers and notify:
+        _notify(service_request, [offer.service_provider_id for offer in offers])
+    return offers
+
+
+def dispatch_request(service_request, now=None, notify=True):
+    """Start dispatching a new pending request"""
+    if service_request.status != 'pending' or service_request.service_provider_id:
+        return []
+    if DispatchOffer.objects.filter(service_request=service_request).exists():
+        return []
+    return offer_next_wave(service_request, now, notify)
+
+
+def accept_offer(offer, now=None):
+    """
+    Assign the request to the offer's provider if it is still unassigned.
+    Returns False when another provider got there first or the offer lapsed.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        claimed = DispatchOffer.objects.filter(
+            pk=offer.pk, status='offered', expires_at__gt=now
+        ).update(status='accepted', responded_at=now)
+        if not claimed:
+            return False
+        assigned = offer.service_request.change_status(
+            'accepted', message='Service request accepted', created_by='provider', expected='pending',
+            service_provider_id=offer.service_provider_id, accepted_at=now,
+        )
+        if not assigned:
+            transaction.set_rollback(True)
+            return False
+        DispatchOffer.objects.filter(service_request_id=offer.service_request_id, status='offered').update(
+            status='withdrawn', responded_at=now
+        )
+    return True
+
+
+def decline_offer(offer, now=None):
+    """Decline an offer; the next wave goes out once no offer of the request is open"""
+    now = now or timezone.now()
+    declined = DispatchOffer.objects.filter(pk=offer.pk, status='offered').update(status='declined', responded_at=now)
+    if declined and not DispatchOffer.objects.filter(service_request_id=offer.service_request_id, status='offered').exists():
+        offer_next_wave(offer.service_request, now)
+    return bool(declined)
+
+
+def advance_dispatch(now=None, notify=True):
+    """
+    Expire lapsed offers and send the next wave for every pending request
+    with no open offer, starting requests never dispatched. Requests whose
+    last wave found nobody wait until their next_dispatch_at. Returns the
+    number of offers sent.
+    """
+    now = now or timezone.now()
+    DispatchOffer.objects.filter(status='offered', expires_at__lte=now).update(status='expired', responded_at=now)
+
+    open_offers = DispatchOffer.objects.filter(service_request=OuterRef('pk'), status='offered')
+    waiting = ServiceRequest.objects.filter(
+        Q(next_dispatch_at__isnull=True) | Q(next_dispatch_at__lte=now),
+        status='pending', service_provider__isnull=True,
+    ).exclude(Exists(open_offers)).select_related('service').order_by('created_at')
+
+    sent = 0
+    for service_request in waiting.iterator():
+        sent += len(offer_next_wave(service_request, now, notify))
+    return sent
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from bookings.dispatch import advance_dispatch
+
+
+class Command(BaseCommand):
+    help = 'Expire lapsed dispatch offers and send the next wave (run every few seconds)'
+
+    def handle(self, *args, **options):
+        sent = advance_dispatch()
+        self.stdout.write(f'Sent {sent} offers')
@@ -0,0 +1,65 @@
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from accounts.models import CustomerProfile, ServiceProviderProfile
+from bookings.models import ServiceRequest
+
+# A plan line reading a table without an index, per database engine
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?!.*\bUSING\b.*\bINDEX\b)(\w+)'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'mysql': re.compile(r'\btype: ALL\b|\|\s*ALL\s*\|'),
+}
+
+
+def hot_queries(customer_id, provider_id):
+    """The ServiceRequest queries behind the booking lists and dashboards"""
+    return {
+        'customer booking list': ServiceRequest.objects.filter(
+            customer_id=customer_id
+        ).order_by('-created_at', '-id')[:21],
+        'provider booking list': ServiceRequest.objects.filter(
+            service_provider_id=provider_id
+        ).order_by('-created_at', '-id')[:21],
+        'admin booking list': ServiceRequest.objects.order_by('-created_at', '-id')[:21],
+        'provider pending requests': ServiceRequest.objects.filter(
+            service__provider_id=provider_id, status='pending'
+        ).order_by('-created_at'),
+        'provider active requests': ServiceRequest.objects.filter(
+            service_provider_id=provider_id, status__in=['accepted', 'in_progress']
+        ).order_by('-accepted_at'),
+        'customer pending reviews': ServiceRequest.objects.filter(
+            customer_id=customer_id, status='completed', review__isnull=True
+        )[:3],
+    }
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot ServiceRequest queries and fail if any of them does a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customer', type=int, help='Customer profile id to plan with')
+        parser.add_argument('--provider', type=int, help='Service provider profile id to plan with')
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'No full scan detection for {connection.vendor}')
+
+        customer_id = options['customer'] or CustomerProfile.objects.values_list('id', flat=True).first() or 1
+        provider_id = options['provider'] or ServiceProviderProfile.objects.values_list('id', flat=True).first() or 1
+
+        failures = []
+        for name, queryset in hot_queries(customer_id, provider_id).items():
+            plan = queryset.explain()
+            scans = [line for line in plan.splitlines() if pattern.search(line)]
+            if scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'FULL SCAN  {name}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok         {name}'))
+            if scans or options['verbosity'] > 1:
+                self.stdout.write('\n'.join(f'    {line}' for line in plan.splitlines()))
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queries fall back to a full scan: {', '.join(failures)}")
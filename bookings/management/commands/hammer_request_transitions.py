@@ -0,0 +1,74 @@
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from bookings.models import ServiceRequest
+
+
+class Command(BaseCommand):
+    help = 'Race many threads to accept the same request, round after round, and check exactly one wins'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--rounds', type=int, default=50)
+
+    def handle(self, *args, **options):
+        template = ServiceRequest.objects.select_related('service').first()
+        if template is None:
+            raise CommandError('Needs one existing service request to copy the customer, service and vehicle from')
+
+        # A scratch copy keeps real requests untouched
+        target = ServiceRequest.objects.create(
+            customer_id=template.customer_id, service_id=template.service_id, vehicle_id=template.vehicle_id,
+            description='Transition hammer', pickup_latitude=template.pickup_latitude,
+            pickup_longitude=template.pickup_longitude, pickup_address='Transition hammer',
+        )
+        provider_id = template.service.provider_id
+        threads = options['threads']
+        start_gate = threading.Barrier(threads + 1)
+        end_gate = threading.Barrier(threads + 1)
+        wins = [[0] * threads for _ in range(options['rounds'])]
+        errors = []
+
+        def worker(index):
+            try:
+                for round_number in range(options['rounds']):
+                    start_gate.wait()
+                    # Each thread holds its own stale copy, like a second browser tab
+                    service_request = ServiceRequest.objects.get(pk=target.pk)
+                    if service_request.transition('accepted', 'pending', service_provider_id=provider_id):
+                        wins[round_number][index] += 1
+                    end_gate.wait()
+            except Exception as exc:
+                errors.append(exc)
+                start_gate.abort()
+                end_gate.abort()
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+        for thread in workers:
+            thread.start()
+        started = time.perf_counter()
+        try:
+            for _ in range(options['rounds']):
+                ServiceRequest.objects.filter(pk=target.pk).update(status='pending', service_provider=None)
+                start_gate.wait()
+                end_gate.wait()
+        except threading.BrokenBarrierError:
+            pass
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        target.delete()
+
+        winners = [sum(round_wins) for round_wins in wins]
+        bad_rounds = sum(1 for count in winners if count != 1)
+        self.stdout.write(
+            f'{options["rounds"]} rounds x {threads} threads in {elapsed:.2f}s: '
+            f'{bad_rounds} rounds without exactly one winner, {len(errors)} errors'
+        )
+        if errors:
+            raise CommandError(f'Transition failed: {errors[0]!r}')
+        if bad_rounds:
+            raise CommandError('Concurrent accepts did not have exactly one winner')
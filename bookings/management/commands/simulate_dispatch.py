@@ -0,0 +1,198 @@
+import heapq
+import math
+import random
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from accounts.models import CustomerProfile, ServiceProviderProfile, User, Vehicle
+from bookings.dispatch import accept_offer, advance_dispatch, decline_offer, dispatch_request
+from bookings.models import DispatchOffer, ServiceRequest
+from services.models import Service, ServiceCategory
+
+KM_PER_DEGREE = 111.32
+PRIORITIES = ['low', 'medium', 'high', 'emergency']
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a synthetic request stream through the dispatch engine on a simulated clock and '
+        'report engine and match latency percentiles. Everything it writes is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--providers', type=int, default=0, help='Synthetic providers to add first')
+        parser.add_argument('--category', type=int, help='Service category id (default: the most offered)')
+        parser.add_argument('--center', type=float, nargs=2, default=None, metavar=('LAT', 'LNG'))
+        parser.add_argument('--spread-km', type=float, default=15.0)
+        parser.add_argument('--interval', type=float, default=10.0, help='Mean seconds between requests')
+        parser.add_argument('--accept-rate', type=float, default=0.5)
+        parser.add_argument('--response-time', type=float, default=40.0, help='Mean seconds to answer an offer')
+        parser.add_argument('--job-minutes', type=float, default=45.0)
+        parser.add_argument('--tick', type=float, default=5.0, help='Seconds between advance_dispatch runs')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        try:
+            with transaction.atomic():
+                self.simulate(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def point(self, center, spread_km):
+        distance = spread_km * math.sqrt(self.random.random())
+        bearing = self.random.uniform(0, 2 * math.pi)
+        latitude = center[0] + distance * math.cos(bearing) / KM_PER_DEGREE
+        longitude = center[1] + distance * math.sin(bearing) / (KM_PER_DEGREE * math.cos(math.radians(center[0])))
+        return round(latitude, 6), round(longitude, 6)
+
+    def setup(self, options):
+        category_id = options['category'] or (
+            Service.objects.filter(is_available=True).values('category_id')
+            .annotate(count=Count('id')).order_by('-count').values_list('category_id', flat=True).first()
+        )
+        category = ServiceCategory.objects.filter(pk=category_id).first() or ServiceCategory.objects.create(
+            name='Simulated dispatch'
+        )
+        center = options['center']
+        if center is None:
+            located = User.objects.filter(user_type='service_provider', latitude__isnull=False).first()
+            center = (float(located.latitude), float(located.longitude)) if located else (0.0, 0.0)
+
+        for number in range(options['providers']):
+            latitude, longitude = self.point(center, options['spread_km'])
+            user = User.objects.create(
+                username=f'dispatch-sim-provider-{number}', user_type='service_provider',
+                latitude=latitude, longitude=longitude,
+            )
+            provider = ServiceProviderProfile.objects.create(
+                user=user, business_name=f'Simulated provider {number}', business_license=f'dispatch-sim-{number}',
+                provider_type='mechanic', is_approved=True,
+            )
+            Service.objects.create(
+                provider=provider, category=category, name='Simulated service', base_price=50,
+                estimated_duration=timedelta(hours=1),
+            )
+        service = Service.objects.filter(category=category, is_available=True).first()
+        if service is None:
+            raise CommandError('No service in the category; pass --providers to add some')
+
+        user = User.objects.create(username='dispatch-sim-customer', user_type='customer')
+        customer = CustomerProfile.objects.create(user=user)
+        vehicle = Vehicle.objects.create(
+            customer=customer, make='Sim', model='Car', year=2020, vehicle_type='car', license_plate='DISPATCH-SIM',
+        )
+        return center, service, customer, vehicle
+
+    def simulate(self, options):
+        center, service, customer, vehicle = self.setup(options)
+        start = timezone.now()
+        events = []
+        sequence = 0
+
+        def schedule(at, kind, payload=None):
+            nonlocal sequence
+            sequence += 1
+            heapq.heappush(events, (at, sequence, kind, payload))
+
+        def schedule_responses(offers, at):
+            for offer in offers:
+                delay = self.random.expovariate(1 / options['response_time'])
+                schedule(at + delay, 'respond', offer)
+
+        clock = 0.0
+        for number in range(options['requests']):
+            clock += self.random.expovariate(1 / options['interval'])
+            schedule(clock, 'arrive', number)
+        schedule(options['tick'], 'tick')
+
+        arrived_at, matched_at = {}, {}
+        engine_ms, tick_ms = [], []
+        pending = options['requests']
+
+        while events and (pending or any(kind != 'tick' for _, _, kind, _ in events)):
+            at, _, kind, payload = heapq.heappop(events)
+            now = start + timedelta(seconds=at)
+
+            if kind == 'arrive':
+                pending -= 1
+                latitude, longitude = self.point(center, options['spread_km'])
+                service_request = ServiceRequest.objects.create(
+                    customer=customer, service=service, vehicle=vehicle, description='Simulated request',
+                    priority=self.random.choice(PRIORITIES), pickup_latitude=latitude,
+                    pickup_longitude=longitude, pickup_address='Simulated address',
+                )
+                arrived_at[service_request.pk] = at
+                started = time.perf_counter()
+                offers = dispatch_request(service_request, now, notify=False)
+                engine_ms.append((time.perf_counter() - started) * 1000)
+                schedule_responses(offers, at)
+
+            elif kind == 'respond':
+                offer = payload
+                if self.random.random() < options['accept_rate']:
+                    if accept_offer(offer, now) and offer.service_request_id in arrived_at:
+                        matched_at[offer.service_request_id] = at
+                        schedule(at + options['job_minutes'] * 60, 'complete', offer.service_request_id)
+                else:
+                    started = time.perf_counter()
+                    decline_offer(offer, now)
+                    engine_ms.append((time.perf_counter() - started) * 1000)
+                    schedule_responses(
+                        DispatchOffer.objects.filter(
+                            service_request_id=offer.service_request_id, status='offered', offered_at=now
+                        ).select_related('service_request'), at
+                    )
+
+            elif kind == 'complete':
+                ServiceRequest.objects.filter(pk=payload).update(status='completed', completed_at=now)
+
+            elif kind == 'tick':
+                started = time.perf_counter()
+                advance_dispatch(now, notify=False)
+                tick_ms.append((time.perf_counter() - started) * 1000)
+                # Requests already in the database may get offers too; only simulated ones respond
+                schedule_responses(
+                    DispatchOffer.objects.filter(
+                        status='offered', offered_at=now, service_request_id__in=list(arrived_at)
+                    ).select_related('service_request'), at
+                )
+                schedule(at + options['tick'], 'tick')
+
+        self.report(arrived_at, matched_at, engine_ms, tick_ms)
+
+    def report(self, arrived_at, matched_at, engine_ms, tick_ms):
+        match_seconds = [matched_at[pk] - arrived_at[pk] for pk in matched_at]
+        waves = DispatchOffer.objects.filter(service_request_id__in=list(matched_at), status='accepted')
+        waves = list(waves.values_list('wave', flat=True))
+
+        def line(label, values, unit):
+            return (
+                f'{label}: p50 {percentile(values, 0.5):.1f}{unit}  p95 {percentile(values, 0.95):.1f}{unit}  '
+                f'p99 {percentile(values, 0.99):.1f}{unit}  max {max(values, default=0):.1f}{unit}'
+            )
+
+        self.stdout.write(
+            f'Matched {len(matched_at)} of {len(arrived_at)} requests '
+            f'({100 * len(matched_at) / max(len(arrived_at), 1):.1f}%), '
+            f'mean wave {sum(waves) / max(len(waves), 1):.2f}'
+        )
+        self.stdout.write(line('Time to match (simulated)', match_seconds, ' s'))
+        self.stdout.write(line('Engine per dispatch', engine_ms, ' ms'))
+        self.stdout.write(line('advance_dispatch per tick', tick_ms, ' ms'))
@@ -1,8 +1,12 @@
-from django.db import models
+import copy
+from django.db import models, transaction
 from django.utils import timezone
 from accounts.models import CustomerProfile, ServiceProviderProfile, Vehicle
 from services.models import Service
 
+class InvalidTransition(ValueError):
+    pass
+
 class ServiceRequest(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -40,6 +44,8 @@ class ServiceRequest(models.Model):
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     scheduled_for = models.DateTimeField(null=True, blank=True)
+    # Set when a dispatch wave found no provider; dispatch retries after it
+    next_dispatch_at = models.DateTimeField(null=True, blank=True, editable=False)
     
     # Pricing
     estimated_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -54,19 +60,153 @@ class ServiceRequest(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination order for the booking lists
+            models.Index(fields=['-created_at', '-id'], name='request_created_id_idx'),
+            # Customer and provider booking lists and dashboards
+            models.Index(fields=['customer', '-created_at', '-id'], name='request_customer_created_idx'),
+            models.Index(fields=['service_provider', '-created_at', '-id'], name='request_provider_created_idx'),
+            # Provider's active jobs, read in -accepted_at order; a status column in
+            # between would need a sort to merge the accepted and in_progress ranges
+            models.Index(fields=['service_provider', '-accepted_at'], name='request_provider_accepted_idx'),
+            # Pending requests for a provider's services; these span several services,
+            # so the few rows found are still sorted by created_at
+            models.Index(
+                fields=['service', '-created_at'], name='request_pending_service_idx',
+                condition=models.Q(status='pending')
+            ),
+            # Completed requests still waiting for a review, newest first
+            models.Index(
+                fields=['customer', '-created_at'], name='request_completed_idx',
+                condition=models.Q(status='completed')
+            ),
+        ]
     
     def __str__(self):
         return f"Request #{self.id} - {self.service.name} ({self.status})"
     
-    def update_status(self, new_status, user=None):
+    # Status -> statuses it may move to; anything else is refused
+    TRANSITIONS = {
+        'pending': ('accepted', 'rejected', 'cancelled'),
+        'accepted': ('in_progress', 'cancelled'),
+        'in_progress': ('completed', 'cancelled'),
+        'completed': (),
+        'cancelled': (),
+        'rejected': (),
+    }
+    # Timestamp stamped when a status is entered
+    STATUS_TIMESTAMPS = {
+        'accepted': 'accepted_at',
+        'in_progress': 'started_at',
+        'completed': 'completed_at',
+    }
+    
+    @classmethod
+    def check_transition(cls, old_status, new_status):
+        if new_status not in cls.TRANSITIONS.get(old_status, ()):
+            raise InvalidTransition(f"Cannot move a request from {old_status} to {new_status}")
+    
+    @classmethod
+    def sources_for(cls, new_status):
+        """Statuses that may move to new_status"""
+        return [status for status, targets in cls.TRANSITIONS.items() if new_status in targets]
+    
+    def change_status(self, new_status, message='', created_by='system', expected=None, **changes):
+        """
+        Validated transition that stamps the status timestamp and writes the
+        ServiceRequestUpdate audit row in the same transaction: one UPDATE and
+        one INSERT. Raises InvalidTransition for a move TRANSITIONS forbids and
+        returns False when a concurrent change won.
+        """
+        expected = self.status if expected is None else expected
+        self.check_transition(expected, new_status)
+        now = timezone.now()
+        if new_status in self.STATUS_TIMESTAMPS:
+            changes.setdefault(self.STATUS_TIMESTAMPS[new_status], now)
+        with transaction.atomic():
+            if not self.transition(new_status, expected, **changes):
+                return False
+            ServiceRequestUpdate.objects.create(
+                service_request=self, status=new_status, message=message, created_by=created_by
+            )
+        return True
+    
+    # Bulk targets that need no assigned provider
+    PROVIDERLESS_STATUSES = ('cancelled', 'rejected')
+    
+    @classmethod
+    def bulk_change_status(cls, queryset, new_status, message='', created_by='admin'):
+        """
+        Move every request in queryset that may go to new_status there, with
+        one UPDATE and one bulk INSERT of audit rows. Returns the number moved;
+        requests in a status that cannot move are left alone, as are requests
+        without a provider unless they are being cancelled or rejected. Open
+        dispatch offers of the moved requests are withdrawn.
+        """
+        from .signals import statuses_changed
+        now = timezone.now()
+        changes = {'status': new_status, 'updated_at': now}
+        if new_status in cls.STATUS_TIMESTAMPS:
+            changes[cls.STATUS_TIMESTAMPS[new_status]] = now
+        queryset = queryset.filter(status__in=cls.sources_for(new_status))
+        if new_status not in cls.PROVIDERLESS_STATUSES:
+            queryset = queryset.filter(service_provider__isnull=False)
+        with transaction.atomic():
+            movable = list(queryset.select_for_update().order_by())
+            moved = cls.objects.filter(
+                pk__in=[request.pk for request in movable], status__in=cls.sources_for(new_status)
+            ).update(**changes)
+            if moved < len(movable):
+                # Another writer moved some first; log and signal only ours
+                ours = set(cls.objects.filter(
+                    pk__in=[request.pk for request in movable], status=new_status, updated_at=now
+                ).values_list('pk', flat=True))
+                movable = [request for request in movable if request.pk in ours]
+            ServiceRequestUpdate.objects.bulk_create([
+                ServiceRequestUpdate(service_request=request, status=new_status, message=message, created_by=created_by)
+                for request in movable
+            ])
+            DispatchOffer.objects.filter(
+                service_request__in=[request.pk for request in movable], status='offered'
+            ).update(status='withdrawn', responded_at=now)
+            
+            pairs = []
+            for request in movable:
+                previous = copy.copy(request)
+                for field, value in changes.items():
+                    setattr(request, field, value)
+                pairs.append((request, previous))
+            # One signal for the whole batch, so listeners can batch their writes
+            statuses_changed.send(sender=cls, changes=pairs)
+        return moved
+    
+    def transition(self, new_status, expected=None, **changes):
+        """
+        Move to new_status with UPDATE ... WHERE id=? AND status=expected
+        (default: the status this instance was loaded with), writing only the
+        status and the given fields. Returns False, leaving the instance as it
+        was, when another writer changed the status first.
+        """
+        from .signals import status_changed
+        expected = self.status if expected is None else expected
+        changes['updated_at'] = timezone.now()
+        won = ServiceRequest.objects.filter(pk=self.pk, status=expected).update(status=new_status, **changes)
+        if not won:
+            return False
+        previous = copy.copy(self)
+        previous.status = expected
         self.status = new_status
-        if new_status == 'accepted':
-            self.accepted_at = timezone.now()
-        elif new_status == 'in_progress':
-            self.started_at = timezone.now()
-        elif new_status == 'completed':
-            self.completed_at = timezone.now()
-        self.save()
+        for field, value in changes.items():
+            setattr(self, field, value)
+        # The UPDATE bypasses post_save, so tell the listeners here
+        status_changed.send(sender=ServiceRequest, instance=self, previous=previous)
+        return True
+    
+    def update_status(self, new_status, user=None, message=''):
+        created_by = 'system'
+        if user is not None:
+            created_by = 'provider' if user.user_type == 'service_provider' else user.user_type
+        return self.change_status(new_status, message=message, created_by=created_by)
 
 class ServiceRequestUpdate(models.Model):
     service_request = models.ForeignKey(ServiceRequest, on_delete=models.CASCADE, related_name='updates')
@@ -79,4 +219,41 @@ class ServiceRequestUpdate(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"Update for Request #{self.service_request.id} - {self.status}"
\ No newline at end of file
+        return f"Update for Request #{self.service_request.id} - {self.status}"
+
+class DispatchOffer(models.Model):
+    """A pending request offered to one provider during a dispatch wave"""
+    STATUS_CHOICES = (
+        ('offered', 'Offered'),
+        ('accepted', 'Accepted'),
+        ('declined', 'Declined'),
+        ('expired', 'Expired'),
+        ('withdrawn', 'Withdrawn'),
+    )
+    
+    service_request = models.ForeignKey(ServiceRequest, on_delete=models.CASCADE, related_name='dispatch_offers')
+    service_provider = models.ForeignKey(ServiceProviderProfile, on_delete=models.CASCADE, related_name='dispatch_offers')
+    wave = models.PositiveSmallIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    distance_km = models.FloatField()
+    dispatch_score = models.FloatField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='offered')
+    offered_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+    responded_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['service_request', 'wave', 'rank']
+        unique_together = ['service_request', 'service_provider']
+        indexes = [
+            # A provider's open offers
+            models.Index(fields=['service_provider', 'status', 'expires_at'], name='offer_provider_status_idx'),
+            # Open offers past their deadline
+            models.Index(
+                fields=['expires_at'], name='offer_open_expires_idx',
+                condition=models.Q(status='offered')
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Offer of Request #{self.service_request_id} to {self.service_provider_id} (wave {self.wave})"
@@ -0,0 +1,107 @@
+"""Keyset (cursor) pagination over an ordered tuple of columns"""
+
+import base64
+import json
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_KEYSET = ('created_at', 'id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def _json_value(value):
+    # Full isoformat: DjangoJSONEncoder would drop the microseconds we page on
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(values, reverse=False):
+    payload = json.dumps({'v': values, 'r': reverse}, default=_json_value)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return list(payload['v']), bool(payload['r'])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def _beyond(fields, values, descending):
+    """Rows strictly past values in (fields) order, as an index-friendly OR of prefixes"""
+    lookup = 'lt' if descending else 'gt'
+    condition = Q()
+    for position, field in enumerate(fields):
+        prefix = {fields[i]: values[i] for i in range(position)}
+        prefix[f'{field}__{lookup}'] = values[position]
+        condition |= Q(**prefix)
+    return condition
+
+
+def keyset_paginate(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, fields=DEFAULT_KEYSET, descending=True):
+    """
+    Return one KeysetPage of queryset ordered by fields (newest first when
+    descending). The last field must be unique. Raises InvalidCursor for a
+    cursor that was not produced by this function.
+    """
+    reverse = False
+    if cursor:
+        values, reverse = decode_cursor(cursor)
+        if len(values) != len(fields):
+            raise InvalidCursor(cursor)
+        try:
+            values = [
+                queryset.model._meta.get_field(field).to_python(value)
+                for field, value in zip(fields, values)
+            ]
+        except Exception as exc:
+            raise InvalidCursor(cursor) from exc
+        queryset = queryset.filter(_beyond(fields, values, descending != reverse))
+
+    prefix = '-' if descending != reverse else ''
+    rows = list(queryset.order_by(*[prefix + field for field in fields])[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+
+    def position(row):
+        return [getattr(row, field) for field in fields]
+
+    next_cursor = previous_cursor = None
+    if rows:
+        # Walking backwards always leaves the page we came from ahead of us
+        if has_more if not reverse else True:
+            next_cursor = encode_cursor(position(rows[-1]))
+        if has_more if reverse else bool(cursor):
+            previous_cursor = encode_cursor(position(rows[0]), reverse=True)
+    return KeysetPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Sent by ServiceRequest.transition after its UPDATE, with instance (the
+# request after the change) and previous (a copy as it was before)
+status_changed = Signal()
+
+# Sent once by ServiceRequest.bulk_change_status, with changes: a list of
+# (instance, previous) pairs, so listeners can batch their work
+statuses_changed = Signal()
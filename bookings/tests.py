@@ -0,0 +1,82 @@
+import threading
+from datetime import timedelta
+from django.db import connection
+from django.test import TransactionTestCase
+from accounts.models import CustomerProfile, ServiceProviderProfile, User, Vehicle
+from bookings.models import ServiceRequest, ServiceRequestUpdate
+from services.models import Service, ServiceCategory
+
+THREADS = 8
+ROUNDS = 10
+
+
+class ConcurrentTransitionTests(TransactionTestCase):
+    """Threads racing to accept the same stale request must produce exactly one winner"""
+
+    def setUp(self):
+        customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', user_type='customer')
+        )
+        vehicle = Vehicle.objects.create(
+            customer=customer, make='Make', model='Model', year=2020, vehicle_type='car', license_plate='RACE-1',
+        )
+        self.provider = ServiceProviderProfile.objects.create(
+            user=User.objects.create(username='provider', user_type='service_provider'),
+            business_name='Racer', business_license='RACE', provider_type='mechanic', is_approved=True,
+        )
+        service = Service.objects.create(
+            provider=self.provider, category=ServiceCategory.objects.create(name='Repairs'), name='Repair',
+            base_price=10, estimated_duration=timedelta(hours=1),
+        )
+        self.request = ServiceRequest.objects.create(
+            customer=customer, service=service, vehicle=vehicle, description='Race',
+            pickup_latitude=40.7, pickup_longitude=-74.0, pickup_address='Here',
+        )
+
+    def race(self, attempt):
+        """Run attempt(stale copy) on THREADS threads at once; returns the results and errors"""
+        gate = threading.Barrier(THREADS)
+        results, errors = [], []
+
+        def worker():
+            try:
+                service_request = ServiceRequest.objects.get(pk=self.request.pk)
+                gate.wait()
+                results.append(attempt(service_request))
+            except Exception as exc:
+                errors.append(exc)
+                gate.abort()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def reset(self):
+        ServiceRequest.objects.filter(pk=self.request.pk).update(status='pending', service_provider=None)
+
+    def test_transition_has_one_winner(self):
+        for _ in range(ROUNDS):
+            self.reset()
+            results, errors = self.race(
+                lambda service_request: service_request.transition(
+                    'accepted', 'pending', service_provider_id=self.provider.pk
+                )
+            )
+            self.assertEqual(errors, [])
+            self.assertEqual(results.count(True), 1)
+            self.assertEqual(ServiceRequest.objects.get(pk=self.request.pk).status, 'accepted')
+
+    def test_change_status_writes_one_audit_row(self):
+        results, errors = self.race(
+            lambda service_request: service_request.change_status(
+                'accepted', created_by='provider', service_provider_id=self.provider.pk
+            )
+        )
+        self.assertEqual(errors, [])
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(ServiceRequestUpdate.objects.filter(service_request=self.request, status='accepted').count(), 1)
@@ -9,6 +9,7 @@ urlpatterns = [
     path('<int:booking_id>/', views.booking_detail_view, name='detail'),
     path('<int:booking_id>/update/', views.update_booking_status, name='update_status'),
     path('<int:booking_id>/cancel/', views.cancel_booking_view, name='cancel'),
+    path('bulk-update/', views.bulk_update_status_view, name='bulk_update_status'),
     path('provider/requests/', views.provider_requests_view, name='provider_requests'),
     path('request/<int:request_id>/accept/', views.accept_request_view, name='accept_request'),
     path('request/<int:request_id>/reject/', views.reject_request_view, name='reject_request'),
@@ -1,9 +1,12 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.http import JsonResponse
 from django.utils import timezone
-from .models import ServiceRequest, ServiceRequestUpdate
+from .dispatch import accept_offer, decline_offer, dispatch_request
+from .models import DispatchOffer, InvalidTransition, ServiceRequest, ServiceRequestUpdate
+from .pagination import InvalidCursor, keyset_paginate
 from services.models import Service
 from accounts.models import CustomerProfile, ServiceProviderProfile, Vehicle
 import json
@@ -15,21 +18,28 @@ def booking_list_view(request):
     if user.user_type == 'customer':
         try:
             customer = user.customer_profile
-            bookings = ServiceRequest.objects.filter(customer=customer).order_by('-created_at')
+            bookings = ServiceRequest.objects.filter(customer=customer)
         except CustomerProfile.DoesNotExist:
-            bookings = []
+            bookings = ServiceRequest.objects.none()
             
     elif user.user_type == 'service_provider':
         try:
             provider = user.service_provider_profile
-            bookings = ServiceRequest.objects.filter(service_provider=provider).order_by('-created_at')
+            bookings = ServiceRequest.objects.filter(service_provider=provider)
         except ServiceProviderProfile.DoesNotExist:
-            bookings = []
+            bookings = ServiceRequest.objects.none()
     else:
-        bookings = ServiceRequest.objects.all().order_by('-created_at')
+        bookings = ServiceRequest.objects.all()
+    
+    # Newest first, one page at a time on the (created_at, id) keyset
+    try:
+        page = keyset_paginate(bookings.select_related('service'), request.GET.get('cursor'))
+    except InvalidCursor:
+        page = keyset_paginate(bookings.select_related('service'))
     
     context = {
-        'bookings': bookings,
+        'bookings': page,
+        'page': page,
         'user_type': user.user_type,
     }
     
@@ -86,6 +96,9 @@ def create_booking_view(request):
             created_by='customer'
         )
         
+        # Offer it to the nearest suitable providers in waves
+        transaction.on_commit(lambda: dispatch_request(service_request))
+        
         messages.success(request, 'Service request created successfully!')
         return redirect('bookings:detail', booking_id=service_request.id)
     
@@ -141,15 +154,13 @@ def update_booking_status(request, booking_id):
         return JsonResponse({'error': 'Access denied'}, status=403)
     
     # Update booking status
-    booking.update_status(new_status, user)
-    
-    # Create update record
-    ServiceRequestUpdate.objects.create(
-        service_request=booking,
-        status=new_status,
-        message=message,
-        created_by='provider' if user.user_type == 'service_provider' else 'admin'
-    )
+    # Validates the move and writes the update record in the same transaction
+    try:
+        updated = booking.update_status(new_status, user, message)
+    except InvalidTransition as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    if not updated:
+        return JsonResponse({'error': 'The booking was changed by someone else, reload and retry'}, status=409)
     
     return JsonResponse({'success': True, 'status': new_status})
 
@@ -172,17 +183,19 @@ def cancel_booking_view(request, booking_id):
     
     if request.method == 'POST':
         cancellation_reason = request.POST.get('reason', '')
-        booking.status = 'cancelled'
-        booking.cancellation_reason = cancellation_reason
-        booking.save()
-        
-        # Create update record
-        ServiceRequestUpdate.objects.create(
-            service_request=booking,
-            status='cancelled',
-            message=f'Booking cancelled: {cancellation_reason}',
-            created_by='customer' if request.user.user_type == 'customer' else 'admin'
-        )
+        try:
+            cancelled = booking.change_status(
+                'cancelled',
+                message=f'Booking cancelled: {cancellation_reason}',
+                created_by='customer' if request.user.user_type == 'customer' else 'admin',
+                cancellation_reason=cancellation_reason,
+            )
+        except InvalidTransition as exc:
+            messages.error(request, str(exc))
+            return redirect('bookings:detail', booking_id=booking.id)
+        if not cancelled:
+            messages.error(request, 'The booking was changed meanwhile, please try again.')
+            return redirect('bookings:detail', booking_id=booking.id)
         
         messages.success(request, 'Booking cancelled successfully.')
         return redirect('bookings:detail', booking_id=booking.id)
@@ -204,6 +217,13 @@ def provider_requests_view(request):
             status='pending'
         ).order_by('-created_at')
         
+        # Requests offered to this provider by dispatch
+        offers = DispatchOffer.objects.filter(
+            service_provider=provider,
+            status='offered',
+            expires_at__gt=timezone.now()
+        ).select_related('service_request__service').order_by('expires_at')
+        
         # Get accepted/active requests
         active_requests = ServiceRequest.objects.filter(
             service_provider=provider,
@@ -216,6 +236,7 @@ def provider_requests_view(request):
     
     context = {
         'pending_requests': pending_requests,
+        'offers': offers,
         'active_requests': active_requests,
         'provider': provider,
     }
@@ -229,6 +250,22 @@ def accept_request_view(request, request_id):
     
     try:
         provider = request.user.service_provider_profile
+        
+        offer = DispatchOffer.objects.filter(
+            service_request_id=request_id, service_provider=provider, status='offered'
+        ).first()
+        if offer:
+            if not provider.is_eligible_for_requests:
+                return JsonResponse({
+                    'error': 'You have unpaid dues. Please clear them to accept new requests.'
+                }, status=403)
+            if not accept_offer(offer):
+                return JsonResponse({'error': 'This request is no longer available.'}, status=409)
+            if request.headers.get('Content-Type') == 'application/json':
+                return JsonResponse({'success': True})
+            messages.success(request, 'Service request accepted successfully!')
+            return redirect('bookings:provider_requests')
+        
         service_request = get_object_or_404(
             ServiceRequest,
             id=request_id,
@@ -242,19 +279,13 @@ def accept_request_view(request, request_id):
                 'error': 'You have unpaid dues. Please clear them to accept new requests.'
             }, status=403)
         
-        # Accept the request
-        service_request.service_provider = provider
-        service_request.status = 'accepted'
-        service_request.accepted_at = timezone.now()
-        service_request.save()
-        
-        # Create update record
-        ServiceRequestUpdate.objects.create(
-            service_request=service_request,
-            status='accepted',
-            message='Service request accepted',
-            created_by='provider'
+        # Accept the request; only one provider or click can win
+        accepted = service_request.change_status(
+            'accepted', message='Service request accepted', created_by='provider',
+            expected='pending', service_provider=provider
         )
+        if not accepted:
+            return JsonResponse({'error': 'This request is no longer available.'}, status=409)
         
         if request.headers.get('Content-Type') == 'application/json':
             return JsonResponse({'success': True})
@@ -272,6 +303,18 @@ def reject_request_view(request, request_id):
     
     try:
         provider = request.user.service_provider_profile
+        
+        # Declining a dispatch offer passes the request on to the next wave
+        offer = DispatchOffer.objects.filter(
+            service_request_id=request_id, service_provider=provider, status='offered'
+        ).exclude(service_request__service__provider=provider).first()
+        if offer:
+            decline_offer(offer)
+            if request.headers.get('Content-Type') == 'application/json':
+                return JsonResponse({'success': True})
+            messages.success(request, 'Offer declined.')
+            return redirect('bookings:provider_requests')
+        
         service_request = get_object_or_404(
             ServiceRequest,
             id=request_id,
@@ -281,17 +324,12 @@ def reject_request_view(request, request_id):
         
         rejection_reason = request.POST.get('reason', 'No reason provided')
         
-        service_request.status = 'rejected'
-        service_request.cancellation_reason = rejection_reason
-        service_request.save()
-        
-        # Create update record
-        ServiceRequestUpdate.objects.create(
-            service_request=service_request,
-            status='rejected',
-            message=f'Service request rejected: {rejection_reason}',
-            created_by='provider'
+        rejected = service_request.change_status(
+            'rejected', message=f'Service request rejected: {rejection_reason}', created_by='provider',
+            expected='pending', cancellation_reason=rejection_reason
         )
+        if not rejected:
+            return JsonResponse({'error': 'This request is no longer pending.'}, status=409)
         
         if request.headers.get('Content-Type') == 'application/json':
             return JsonResponse({'success': True})
@@ -300,4 +338,26 @@ def reject_request_view(request, request_id):
         return redirect('bookings:provider_requests')
         
     except ServiceProviderProfile.DoesNotExist:
-        return JsonResponse({'error': 'Service provider profile not found'}, status=404)
\ No newline at end of file
+        return JsonResponse({'error': 'Service provider profile not found'}, status=404)
+
+@login_required
+def bulk_update_status_view(request):
+    """Admin mass update: POST ids (repeated) and status"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    if request.user.user_type != 'admin':
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    new_status = request.POST.get('status')
+    if new_status not in ServiceRequest.TRANSITIONS:
+        return JsonResponse({'error': 'Unknown status'}, status=400)
+    try:
+        ids = [int(value) for value in request.POST.getlist('ids')]
+    except ValueError:
+        return JsonResponse({'error': 'ids must be integers'}, status=400)
+    
+    moved = ServiceRequest.bulk_change_status(
+        ServiceRequest.objects.filter(id__in=ids), new_status,
+        message=request.POST.get('message', ''), created_by='admin'
+    )
+    return JsonResponse({'success': True, 'updated': moved, 'skipped': len(set(ids)) - moved})
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from .models import Message
+from .realtime import RESUME_BATCH_SIZE, conversation_group, is_participant, messages_after, messages_near
+
+# Message ids remembered per socket to drop duplicates from replay and group
+SEEN_IDS_LIMIT = 1000
+
+
+class ConversationConsumer(AsyncJsonWebsocketConsumer):
+    """
+    One socket per participant and conversation. New messages are pushed as
+    {"type": "message", "message": {...}}. Connecting with ?after=<message id>,
+    or sending {"type": "resume", "after": id}, replays what came after it,
+    plus messages just below the cursor that may have committed late, so
+    clients should ignore ids they already have. Clients send
+    {"type": "message", "content": "..."} to post.
+    """
+    async def connect(self):
+        self.conversation_id = self.scope['url_route']['kwargs']['conversation_id']
+        self.user = self.scope.get('user')
+        self.seen = OrderedDict()
+        if not await database_sync_to_async(is_participant)(self.conversation_id, self.user):
+            await self.close(code=4403)
+            return
+
+        # Join before replaying so nothing created in between is missed
+        self.group = conversation_group(self.conversation_id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+        after = self.query_param('after')
+        if after is not None:
+            await self.resume(after)
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group'):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    def query_param(self, name):
+        for pair in self.scope.get('query_string', b'').decode().split('&'):
+            key, _, value = pair.partition('=')
+            if key == name:
+                return value
+        return None
+
+    async def receive_json(self, content, **kwargs):
+        kind = content.get('type')
+        if kind == 'resume':
+            await self.resume(content.get('after'))
+        elif kind == 'message' and content.get('content'):
+            # The post_save signal pushes it to the group, this socket included
+            await database_sync_to_async(Message.objects.create)(
+                conversation_id=self.conversation_id, sender=self.user,
+                message_type='text', content=content['content'],
+            )
+        else:
+            await self.send_json({'type': 'error', 'error': 'Unknown or empty request'})
+
+    async def resume(self, after):
+        try:
+            after = int(after)
+        except (TypeError, ValueError):
+            await self.send_json({'type': 'error', 'error': 'Invalid cursor'})
+            return
+        for payload in await database_sync_to_async(messages_near)(self.conversation_id, after):
+            await self.push(payload)
+        cursor = after
+        while True:
+            batch = await database_sync_to_async(messages_after)(self.conversation_id, cursor)
+            for payload in batch:
+                await self.push(payload)
+            if len(batch) < RESUME_BATCH_SIZE:
+                break
+            cursor = batch[-1]['id']
+
+    async def push(self, payload):
+        # A message can arrive both from the replay and the group, and not
+        # necessarily in id order; send each one once
+        if payload['id'] in self.seen:
+            return
+        self.seen[payload['id']] = None
+        if len(self.seen) > SEEN_IDS_LIMIT:
+            self.seen.popitem(last=False)
+        await self.send_json({'type': 'message', 'message': payload})
+
+    async def chat_message(self, event):
+        await self.push(event['message'])
@@ -0,0 +1,113 @@
+import asyncio
+import statistics
+import time
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+from chat.models import Conversation, Message
+from chat.routing import websocket_application
+
+LOAD_TEST_PREFIX = '[load-test]'
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Connect many simulated WebSocket clients to a conversation and measure message fan-out'
+
+    def add_arguments(self, parser):
+        parser.add_argument('conversation_id', type=int)
+        parser.add_argument('--clients', type=int, default=200)
+        parser.add_argument('--messages', type=int, default=20)
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--keep', action='store_true', help='Keep the messages the test posted')
+
+    def handle(self, *args, **options):
+        try:
+            conversation = Conversation.objects.get(pk=options['conversation_id'])
+        except Conversation.DoesNotExist:
+            raise CommandError('Conversation not found')
+        participants = list(conversation.participants.all())
+        if not participants:
+            raise CommandError('The conversation has no participants')
+
+        try:
+            asyncio.run(self.run(conversation, participants, options))
+        finally:
+            if not options['keep']:
+                Message.objects.filter(
+                    conversation=conversation, content__startswith=LOAD_TEST_PREFIX
+                ).delete()
+
+    def connect(self, conversation, user, after=None):
+        path = f'/ws/chat/{conversation.id}/'
+        if after is not None:
+            path += f'?after={after}'
+        communicator = WebsocketCommunicator(websocket_application, path)
+        communicator.scope['user'] = user
+        return communicator
+
+    async def run(self, conversation, participants, options):
+        count, timeout = options['messages'], options['timeout']
+        clients = [
+            self.connect(conversation, participants[index % len(participants)])
+            for index in range(options['clients'])
+        ]
+
+        started = time.perf_counter()
+        connected = await asyncio.gather(*(client.connect(timeout) for client in clients))
+        if not all(accepted for accepted, _ in connected):
+            raise CommandError('A client was refused; are the participants allowed in?')
+        self.stdout.write(f'Connected {len(clients)} clients in {time.perf_counter() - started:.2f} s')
+
+        sent_at = {}
+        latencies = []
+
+        async def listen(client):
+            for _ in range(count):
+                frame = await client.receive_json_from(timeout)
+                latencies.append(time.perf_counter() - sent_at[frame['message']['content']])
+
+        listeners = [asyncio.ensure_future(listen(client)) for client in clients]
+        started = time.perf_counter()
+        for number in range(count):
+            content = f'{LOAD_TEST_PREFIX} {number}'
+            sent_at[content] = time.perf_counter()
+            await clients[number % len(clients)].send_json_to({'type': 'message', 'content': content})
+        await asyncio.gather(*listeners)
+        elapsed = time.perf_counter() - started
+
+        deliveries = len(latencies)
+        self.stdout.write(
+            f'Delivered {deliveries} pushes ({count} messages x {len(clients)} clients) in {elapsed:.2f} s '
+            f'({deliveries / elapsed:.0f} pushes/s)'
+        )
+        self.stdout.write(
+            'Latency ms: p50 {:.1f}  p95 {:.1f}  p99 {:.1f}  max {:.1f}  mean {:.1f}'.format(
+                *(value * 1000 for value in (
+                    percentile(latencies, 0.5), percentile(latencies, 0.95), percentile(latencies, 0.99),
+                    max(latencies), statistics.mean(latencies),
+                ))
+            )
+        )
+
+        # A late client resuming from the first test message only gets the rest
+        first_id = await sync_to_async(
+            lambda: Message.objects.filter(
+                conversation=conversation, content=f'{LOAD_TEST_PREFIX} 0'
+            ).order_by('-id').values_list('id', flat=True).first()
+        )()
+        late = self.connect(conversation, participants[0], after=first_id)
+        await late.connect(timeout)
+        replayed = 0
+        while not await late.receive_nothing(0.2):
+            await late.receive_json_from(timeout)
+            replayed += 1
+        self.stdout.write(f'Resumed after message {first_id}: replayed {replayed} of {count - 1} later messages')
+
+        await asyncio.gather(late.disconnect(), *(client.disconnect() for client in clients))
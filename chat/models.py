@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from accounts.models import User
 from bookings.models import ServiceRequest
 
@@ -11,6 +12,13 @@ class Conversation(models.Model):
     def __str__(self):
         return f"Conversation for Request #{self.service_request.id}"
 
+    def mark_read_up_to(self, user, message):
+        """Mark the messages others sent up to and including message read, with one UPDATE"""
+        return self.messages.filter(
+            Q(created_at__lt=message.created_at) | Q(created_at=message.created_at, id__lte=message.id),
+            is_read=False,
+        ).exclude(sender=user).update(is_read=True)
+
 class Message(models.Model):
     MESSAGE_TYPES = (
         ('text', 'Text'),
@@ -32,6 +40,10 @@ class Message(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # History pages walk a conversation by (created_at, id)
+            models.Index(fields=['conversation', 'created_at'], name='message_conv_created_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender.username} in {self.conversation}"
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""Pushing conversation messages to connected WebSocket clients"""
+
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from .models import Message
+
+# Messages sent per frame when a client catches up from a cursor
+RESUME_BATCH_SIZE = 200
+# Ids are assigned before commit, so a message can become visible after a
+# higher id; replays also resend what was created this long before the cursor
+RESUME_GRACE = timedelta(seconds=30)
+
+
+def conversation_group(conversation_id):
+    return f'chat.conversation.{conversation_id}'
+
+
+def message_payload(message):
+    return {
+        'id': message.id,
+        'conversation': message.conversation_id,
+        'sender': message.sender_id,
+        'message_type': message.message_type,
+        'content': message.content,
+        'image': message.image.url if message.image else None,
+        'latitude': str(message.latitude) if message.latitude is not None else None,
+        'longitude': str(message.longitude) if message.longitude is not None else None,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+def messages_after(conversation_id, after_id, limit=RESUME_BATCH_SIZE):
+    """Payloads of the messages after a message id, oldest first"""
+    messages = Message.objects.filter(conversation_id=conversation_id, id__gt=after_id or 0).order_by('id')[:limit]
+    return [message_payload(message) for message in messages]
+
+
+def messages_near(conversation_id, after_id, grace=RESUME_GRACE, limit=RESUME_BATCH_SIZE):
+    """
+    Payloads of the messages up to a message id created within grace of it,
+    oldest first; these may have committed after the client saw the cursor.
+    """
+    cursor = Message.objects.filter(conversation_id=conversation_id, id=after_id).values('created_at')[:1]
+    messages = Message.objects.filter(
+        conversation_id=conversation_id, id__lte=after_id, created_at__gte=cursor[0]['created_at'] - grace
+    ) if cursor else Message.objects.none()
+    return [message_payload(message) for message in reversed(messages.order_by('-id')[:limit])]
+
+
+def is_participant(conversation_id, user):
+    if not user or not user.is_authenticated:
+        return False
+    return user.conversations.filter(id=conversation_id).exists()
+
+
+def broadcast_message(message):
+    """Send a message to every socket in its conversation group"""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    async_to_sync(layer.group_send)(
+        conversation_group(message.conversation_id),
+        {'type': 'chat.message', 'message': message_payload(message)},
+    )
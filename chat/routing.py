@@ -0,0 +1,10 @@
+from channels.routing import URLRouter
+from django.urls import path
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/chat/<int:conversation_id>/', consumers.ConversationConsumer.as_asgi()),
+]
+
+# Without the auth middleware; callers set scope['user'] themselves
+websocket_application = URLRouter(websocket_urlpatterns)
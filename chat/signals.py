@@ -0,0 +1,11 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Message
+from .realtime import broadcast_message
+
+
+@receiver(post_save, sender=Message)
+def push_message(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: broadcast_message(instance))
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+from services.checks import PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches, deploy=True)
+def check_unread_cache(app_configs, **kwargs):
+    alias = getattr(settings, 'NOTIFICATION_CACHE_ALIAS', 'default')
+    if settings.CACHES.get(alias, {}).get('BACKEND') in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            f"NOTIFICATION_CACHE_ALIAS '{alias}' is a per-process cache.",
+            hint='Unread counters changed by other workers and commands are not seen; '
+                 'point it at memcached, Redis or the database cache.',
+            id='notifications.W001',
+        )]
+    return []
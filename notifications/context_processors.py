@@ -0,0 +1,10 @@
+from functools import partial
+from .counters import unread_count
+
+
+def unread_notifications(request):
+    """Unread badge count, only looked up when a template uses it"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'unread_notification_count': partial(unread_count, user.pk)}
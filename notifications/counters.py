@@ -0,0 +1,88 @@
+"""
+Cached per-user unread notification counters. Every process must see the
+same counters, so NOTIFICATION_CACHE_ALIAS has to name a shared cache
+(memcached, Redis, database) once more than one process runs.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from .models import Notification
+
+# Seconds a fill in progress watches for concurrent changes
+UNREAD_FILL_TIMEOUT = 60
+
+
+def get_cache():
+    return caches[getattr(settings, 'NOTIFICATION_CACHE_ALIAS', 'default')]
+
+
+def unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def changed_key(user_id):
+    """Set when a counter could not be adjusted because it was not cached"""
+    return f'notifications:unread-changed:{user_id}'
+
+
+def unread_counts(user_ids):
+    """Return {user_id: unread count}, counting and caching the ones not cached"""
+    cache = get_cache()
+    cached = cache.get_many([unread_key(user_id) for user_id in user_ids])
+    counts = {}
+    for user_id in user_ids:
+        count = cached.get(unread_key(user_id))
+        if count is None:
+            count = _fill(cache, user_id)
+        counts[user_id] = count
+    return counts
+
+
+def _fill(cache, user_id):
+    """
+    Count and cache one user's unread notifications. Changes made while
+    counting find no counter to adjust and flag it instead, and a flagged
+    count is not cached, so the next read counts again.
+    """
+    cache.set(changed_key(user_id), False, UNREAD_FILL_TIMEOUT)
+    count = Notification.unread(user_id).count()
+    if cache.get(changed_key(user_id)) is False:
+        cache.add(unread_key(user_id), count, getattr(settings, 'NOTIFICATION_UNREAD_TIMEOUT', 3600))
+        # A change between the check and the add would have been missed
+        if cache.get(changed_key(user_id)) is not False:
+            cache.delete(unread_key(user_id))
+    return count
+
+
+def unread_count(user_id):
+    return unread_counts([user_id])[user_id]
+
+
+def adjust_unread(user_id, delta):
+    """
+    Apply delta to a cached counter once the current transaction commits;
+    one not cached stays absent and is flagged for fills
+    """
+    if user_id and delta:
+        transaction.on_commit(lambda: _adjust(user_id, delta))
+
+
+def _adjust(user_id, delta):
+    cache = get_cache()
+    try:
+        cache.incr(unread_key(user_id), delta)
+    except ValueError:
+        cache.set(changed_key(user_id), True, UNREAD_FILL_TIMEOUT)
+
+
+def forget_unread(user_ids):
+    """Drop cached counters, once the current transaction commits, so the next read recounts them"""
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: _forget(user_ids))
+
+
+def _forget(user_ids):
+    cache = get_cache()
+    cache.set_many({changed_key(user_id): True for user_id in user_ids}, UNREAD_FILL_TIMEOUT)
+    cache.delete_many([unread_key(user_id) for user_id in user_ids])
@@ -0,0 +1,223 @@
+"""Asynchronous push delivery of unsent notifications"""
+
+import asyncio
+import random
+import time
+from collections import defaultdict, deque, namedtuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+from django.utils.module_loading import import_string
+from .models import Notification, PushNotificationDevice
+
+DEFAULT_PUSH_GATEWAY = 'notifications.delivery.UnconfiguredGateway'
+DELIVERY_BATCH_SIZE = 500
+DELIVERY_CONCURRENCY = 50
+DELIVERY_MAX_ATTEMPTS = 4
+DELIVERY_MAX_RUNS = 5  # runs a notification may fail in before the worker gives up on it
+DELIVERY_BACKOFF = 0.5  # seconds, doubled on each retry
+
+PushMessage = namedtuple('PushMessage', ['notification_id', 'device_id', 'token', 'title', 'body'])
+DeliveryResult = namedtuple('DeliveryResult', ['sent', 'failed', 'messages', 'elapsed', 'per_second'])
+
+
+class GatewayError(Exception):
+    """A send that may succeed if retried"""
+
+
+class InvalidDeviceToken(GatewayError):
+    """The gateway rejected the token for good; the device is deactivated"""
+
+
+class PushGateway:
+    """Interface for a push provider; one instance serves one device type"""
+    enabled = True
+
+    def __init__(self, device_type):
+        self.device_type = device_type
+
+    async def send(self, message):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class UnconfiguredGateway(PushGateway):
+    """
+    Default for device types missing from PUSH_GATEWAYS. Nothing is sent, so
+    their notifications stay unsent until a real gateway is configured.
+    """
+    enabled = False
+
+    async def send(self, message):
+        raise GatewayError(f"No push gateway configured for {self.device_type}")
+
+
+class FakeGateway(PushGateway):
+    """
+    Local gateway that records messages instead of sending them, for tests
+    and load runs only. latency is seconds per send; failure_rate is the
+    share of sends raising GatewayError. Only the last `keep` messages are
+    kept in sent.
+    """
+    def __init__(self, device_type, latency=0.005, failure_rate=0.0, seed=None, keep=1000):
+        super().__init__(device_type)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.sent = deque(maxlen=keep)
+        self.sent_count = 0
+
+    async def send(self, message):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            raise GatewayError(f"Simulated failure for {message.token}")
+        self.sent.append(message)
+        self.sent_count += 1
+
+
+def get_push_gateway(device_type):
+    """Instantiate the PUSH_GATEWAYS backend configured for a device type"""
+    gateways = getattr(settings, 'PUSH_GATEWAYS', {})
+    config = dict(gateways.get(device_type, {'BACKEND': DEFAULT_PUSH_GATEWAY}))
+    backend = config.pop('BACKEND', DEFAULT_PUSH_GATEWAY)
+    return import_string(backend)(device_type, **config.get('OPTIONS', {}))
+
+
+def load_batch(after_id, batch_size, max_runs=DELIVERY_MAX_RUNS):
+    """
+    Return (last_id, notification_ids, messages by device type) for the next
+    batch of unsent notifications after after_id that have failed in fewer
+    than max_runs runs.
+    """
+    notifications = list(
+        Notification.objects.filter(is_sent=False, id__gt=after_id, push_attempts__lt=max_runs)
+        .order_by('id')
+        .values_list('id', 'recipient_id', 'title', 'message')[:batch_size]
+    )
+    if not notifications:
+        return None, [], {}
+
+    devices = defaultdict(list)
+    for device_id, user_id, token, device_type in PushNotificationDevice.objects.filter(
+        is_active=True, user_id__in={row[1] for row in notifications}
+    ).values_list('id', 'user_id', 'device_token', 'device_type'):
+        devices[user_id].append((device_id, token, device_type))
+
+    messages = defaultdict(list)
+    for notification_id, user_id, title, body in notifications:
+        for device_id, token, device_type in devices[user_id]:
+            messages[device_type].append(PushMessage(notification_id, device_id, token, title, body))
+    return notifications[-1][0], [row[0] for row in notifications], messages
+
+
+def mark_delivered(notification_ids, invalid_device_ids, failed_ids=()):
+    """
+    Mark notifications sent, count a failed run against the undelivered ones
+    and deactivate rejected devices, one UPDATE each
+    """
+    if notification_ids:
+        Notification.objects.filter(id__in=notification_ids).update(is_sent=True)
+    if failed_ids:
+        Notification.objects.filter(id__in=failed_ids).update(push_attempts=F('push_attempts') + 1)
+    if invalid_device_ids:
+        PushNotificationDevice.objects.filter(id__in=invalid_device_ids).update(is_active=False)
+
+
+class DeliveryWorker:
+    """
+    Pulls unsent notifications in batches and pushes them to every active
+    device of the recipient, at most `concurrency` sends in flight. A
+    notification is marked sent once any device accepted it, or when the
+    recipient has no device; failed ones stay unsent for the next run, as do
+    those only bound for device types without a configured gateway, until
+    they have failed in max_runs runs.
+    """
+    def __init__(self, gateways=None, batch_size=DELIVERY_BATCH_SIZE, concurrency=DELIVERY_CONCURRENCY,
+                 max_attempts=DELIVERY_MAX_ATTEMPTS, backoff=DELIVERY_BACKOFF, max_runs=DELIVERY_MAX_RUNS):
+        self.gateways = dict(gateways or {})
+        self.max_runs = max_runs
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+    def gateway(self, device_type):
+        if device_type not in self.gateways:
+            self.gateways[device_type] = get_push_gateway(device_type)
+        return self.gateways[device_type]
+
+    async def send(self, gateway, message, semaphore):
+        """Send one message with retries; returns True, False, or None for a dead token"""
+        for attempt in range(self.max_attempts):
+            async with semaphore:
+                try:
+                    await gateway.send(message)
+                    return True
+                except InvalidDeviceToken:
+                    return None
+                except GatewayError:
+                    pass
+            if attempt + 1 < self.max_attempts:
+                # Back off outside the semaphore so other sends keep flowing
+                delay = self.backoff * 2 ** attempt
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+        return False
+
+    async def deliver(self, messages):
+        """Send {device_type: [PushMessage]}; returns (delivered ids, failed ids, dead device ids)"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        delivered, failed, invalid = set(), set(), set()
+        sends = []
+        for device_type, batch in messages.items():
+            gateway = self.gateway(device_type)
+            if not gateway.enabled:
+                failed.update(message.notification_id for message in batch)
+                continue
+            sends.extend((message, self.send(gateway, message, semaphore)) for message in batch)
+        outcomes = await asyncio.gather(*(send for _, send in sends))
+
+        for (message, _), outcome in zip(sends, outcomes):
+            if outcome:
+                delivered.add(message.notification_id)
+            elif outcome is None:
+                invalid.add(message.device_id)
+            else:
+                failed.add(message.notification_id)
+        return delivered, failed - delivered, invalid
+
+    async def run_once(self):
+        """Deliver everything that is currently unsent"""
+        started = time.perf_counter()
+        after_id, sent, failed, pushed = 0, 0, 0, 0
+        while True:
+            last_id, notification_ids, messages = await sync_to_async(load_batch)(
+                after_id, self.batch_size, self.max_runs
+            )
+            if last_id is None:
+                break
+            delivered, undelivered, invalid = await self.deliver(messages)
+            done = [notification_id for notification_id in notification_ids if notification_id not in undelivered]
+            await sync_to_async(mark_delivered)(done, invalid, undelivered)
+            sent += len(done)
+            failed += len(undelivered)
+            pushed += sum(len(batch) for batch in messages.values())
+            after_id = last_id
+
+        elapsed = time.perf_counter() - started
+        return DeliveryResult(sent, failed, pushed, elapsed, pushed / elapsed if elapsed else 0.0)
+
+    async def run(self, interval=5.0):
+        """Deliver forever, polling for new notifications every interval seconds"""
+        try:
+            while True:
+                await self.run_once()
+                await asyncio.sleep(interval)
+        finally:
+            await self.close()
+
+    async def close(self):
+        for gateway in self.gateways.values():
+            await gateway.close()
@@ -0,0 +1,103 @@
+"""Bulk notification fan-out"""
+
+import threading
+import time
+from collections import namedtuple
+from string import Template
+from django.db import close_old_connections
+from accounts.models import User
+from .counters import forget_unread
+from .models import Notification
+
+FANOUT_CHUNK_SIZE = 5000
+RECIPIENT_FIELDS = ('id', 'username', 'first_name', 'last_name')
+
+FanoutResult = namedtuple('FanoutResult', ['created', 'elapsed', 'per_second'])
+
+
+class NotificationTemplate:
+    """
+    A $placeholder template rendered per recipient. Recipient fields are
+    $username, $first_name, $last_name and $full_name; context adds more.
+    Unknown placeholders are left as they are.
+    """
+    def __init__(self, text, context=None):
+        self.template = Template(text)
+        self.context = dict(context or {})
+        # Without recipient placeholders every row gets the same text
+        names = set(RECIPIENT_FIELDS) | {'full_name'}
+        used = {match.group('named') or match.group('braced') for match in Template.pattern.finditer(text)}
+        self.static = None if used & names else self.template.safe_substitute(self.context)
+
+    def render(self, username, first_name, last_name):
+        if self.static is not None:
+            return self.static
+        return self.template.safe_substitute(
+            self.context,
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            full_name=f'{first_name} {last_name}'.strip() or username,
+        )
+
+
+def _insert(batch):
+    Notification.objects.bulk_create(batch)
+    # bulk_create skips signals, so drop the recipients' cached unread counters
+    forget_unread([notification.recipient_id for notification in batch])
+    return len(batch)
+
+
+def fan_out(recipients, notification_type, title, message, context=None,
+            related_object=None, chunk_size=FANOUT_CHUNK_SIZE):
+    """
+    Create one notification per user in recipients (a User queryset),
+    streaming recipient rows in chunks and inserting them with bulk_create.
+    """
+    started = time.perf_counter()
+    title_template = NotificationTemplate(title, context)
+    message_template = NotificationTemplate(message, context)
+    related_id = related_object.pk if related_object is not None else None
+    related_type = related_object._meta.model_name if related_object is not None else ''
+
+    created = 0
+    batch = []
+    rows = recipients.order_by().values_list(*RECIPIENT_FIELDS).iterator(chunk_size=chunk_size)
+    for user_id, username, first_name, last_name in rows:
+        batch.append(Notification(
+            recipient_id=user_id,
+            notification_type=notification_type,
+            title=title_template.render(username, first_name, last_name)[:200],
+            message=message_template.render(username, first_name, last_name),
+            related_object_id=related_id,
+            related_object_type=related_type,
+        ))
+        if len(batch) >= chunk_size:
+            created += _insert(batch)
+            batch = []
+    if batch:
+        created += _insert(batch)
+
+    elapsed = time.perf_counter() - started
+    return FanoutResult(created, elapsed, created / elapsed if elapsed else 0.0)
+
+
+def fan_out_in_background(recipients, notification_type, title, message, **kwargs):
+    """Run fan_out on a daemon thread so a request can return straight away"""
+    def run():
+        close_old_connections()
+        try:
+            fan_out(recipients, notification_type, title, message, **kwargs)
+        finally:
+            close_old_connections()
+
+    thread = threading.Thread(target=run, name='notification-fanout', daemon=True)
+    thread.start()
+    return thread
+
+
+AUDIENCES = {
+    'all': lambda: User.objects.filter(is_active=True),
+    'customers': lambda: User.objects.filter(is_active=True, user_type='customer'),
+    'providers': lambda: User.objects.filter(is_active=True, user_type='service_provider'),
+}
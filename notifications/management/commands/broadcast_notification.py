@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from notifications.fanout import AUDIENCES, FANOUT_CHUNK_SIZE, fan_out
+from notifications.models import Notification
+
+
+class Command(BaseCommand):
+    help = 'Send a templated notification to every user in an audience, e.g. "Hi $first_name"'
+
+    def add_arguments(self, parser):
+        parser.add_argument('title')
+        parser.add_argument('message')
+        parser.add_argument('--audience', choices=sorted(AUDIENCES), default='all')
+        parser.add_argument(
+            '--type', dest='notification_type', default='promotion',
+            choices=[choice for choice, _ in Notification.NOTIFICATION_TYPES],
+        )
+        parser.add_argument('--chunk-size', type=int, default=FANOUT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        result = fan_out(
+            AUDIENCES[options['audience']](), options['notification_type'],
+            options['title'], options['message'], chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(
+            f'Created {result.created} notifications in {result.elapsed:.2f} s '
+            f'({result.per_second:.0f}/s)'
+        )
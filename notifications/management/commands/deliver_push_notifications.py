@@ -0,0 +1,47 @@
+import asyncio
+from django.core.management.base import BaseCommand
+from notifications.delivery import (
+    DELIVERY_BATCH_SIZE, DELIVERY_CONCURRENCY, DeliveryWorker, FakeGateway,
+)
+
+
+class Command(BaseCommand):
+    help = 'Push unsent notifications to user devices (--once to drain and report messages per second)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Deliver what is pending, then exit')
+        parser.add_argument('--interval', type=float, default=5.0)
+        parser.add_argument('--batch-size', type=int, default=DELIVERY_BATCH_SIZE)
+        parser.add_argument('--concurrency', type=int, default=DELIVERY_CONCURRENCY)
+        parser.add_argument('--fake', action='store_true', help='Use the local fake gateway for every device type')
+        parser.add_argument('--fake-latency', type=float, default=0.005)
+        parser.add_argument('--fake-failure-rate', type=float, default=0.0)
+
+    def handle(self, *args, **options):
+        gateways = None
+        if options['fake']:
+            gateways = {
+                device_type: FakeGateway(
+                    device_type, latency=options['fake_latency'], failure_rate=options['fake_failure_rate']
+                )
+                for device_type in ('ios', 'android')
+            }
+        worker = DeliveryWorker(
+            gateways, batch_size=options['batch_size'], concurrency=options['concurrency'],
+        )
+
+        if not options['once']:
+            asyncio.run(worker.run(options['interval']))
+            return
+
+        async def drain():
+            try:
+                return await worker.run_once()
+            finally:
+                await worker.close()
+
+        result = asyncio.run(drain())
+        self.stdout.write(
+            f'Sent {result.sent} notifications ({result.messages} pushes, {result.failed} failed) '
+            f'in {result.elapsed:.2f} s ({result.per_second:.0f} pushes/s)'
+        )
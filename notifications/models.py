@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from accounts.models import User
 
 class Notification(models.Model):
@@ -22,21 +23,54 @@ class Notification(models.Model):
     
     is_read = models.BooleanField(default=False)
     is_sent = models.BooleanField(default=False)
+    # Delivery runs that failed to push it; the worker gives up at DELIVERY_MAX_RUNS
+    push_attempts = models.PositiveSmallIntegerField(default=0, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Inbox listing and unread counts per recipient
+            models.Index(fields=['recipient', 'is_read', '-created_at'], name='notification_inbox_idx'),
+            # The delivery worker's scan of unsent notifications
+            models.Index(fields=['id'], name='notification_unsent_idx', condition=models.Q(is_sent=False)),
+        ]
     
     def __str__(self):
         return f"Notification for {self.recipient.username}: {self.title}"
     
     def mark_as_read(self):
         if not self.is_read:
+            from .counters import adjust_unread
             self.is_read = True
             self.read_at = timezone.now()
-            self.save()
+            # Conditional UPDATE so a concurrent read is only counted once
+            updated = Notification.objects.filter(pk=self.pk, is_read=False).update(
+                is_read=True, read_at=self.read_at
+            )
+            if updated:
+                adjust_unread(self.recipient_id, -1)
+
+    @classmethod
+    def inbox(cls, user):
+        """A user's notifications, unread first then newest, read off notification_inbox_idx"""
+        return cls.objects.filter(recipient=user).order_by('is_read', '-created_at')
+
+    @classmethod
+    def unread(cls, user):
+        # is_read=False compiles to NOT is_read, which SQLite cannot match to the index
+        return cls.objects.filter(recipient=user, is_read__in=[False]).order_by('-created_at')
+
+    @classmethod
+    def mark_all_read(cls, user):
+        """Mark every unread notification of a user read with one UPDATE"""
+        from .counters import forget_unread
+        updated = cls.unread(user).order_by().update(is_read=True, read_at=timezone.now())
+        # Dropped rather than zeroed so a notification created meanwhile is not lost
+        forget_unread([user.pk])
+        return updated
 
 class PushNotificationDevice(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='devices')
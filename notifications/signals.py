@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .counters import adjust_unread
+from .models import Notification
+
+
+@receiver(pre_save, sender=Notification)
+def remember_read_state(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if not instance.pk or (update_fields is not None and not {'is_read', 'recipient'} & set(update_fields)):
+        instance._previous_unread = None
+        return
+    instance._previous_unread = Notification.objects.filter(pk=instance.pk).values('is_read', 'recipient_id').first()
+
+
+@receiver(post_save, sender=Notification)
+def count_unread(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_unread', None)
+    if created:
+        if not instance.is_read:
+            adjust_unread(instance.recipient_id, 1)
+    elif previous:
+        if not previous['is_read']:
+            adjust_unread(previous['recipient_id'], -1)
+        if not instance.is_read:
+            adjust_unread(instance.recipient_id, 1)
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_unread(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread(instance.recipient_id, -1)
@@ -0,0 +1,116 @@
+"""Streaming financial exports of invoices, payments and commissions"""
+
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Commission, Invoice, Payment
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+INVOICE_COLUMNS = [
+    'invoice_number', 'issued_at', 'service_request_id', 'subtotal', 'tax_amount', 'discount_amount',
+    'total_amount', 'payment_status', 'payment_method', 'paid_amount', 'due_date', 'paid_at',
+    'item_description', 'item_quantity', 'item_unit_price', 'item_total_price',
+]
+PAYMENT_COLUMNS = [
+    'payment_id', 'invoice_number', 'amount', 'payment_method', 'payment_status', 'transaction_id',
+    'created_at', 'processed_at', 'commission_id', 'commission_rate', 'commission_amount',
+    'commission_status', 'service_provider_id',
+]
+COMMISSION_COLUMNS = [
+    'commission_id', 'service_provider_id', 'business_name', 'payment_id', 'invoice_number',
+    'commission_rate', 'commission_amount', 'status', 'is_cash_payment', 'due_date', 'paid_at', 'created_at',
+]
+
+
+def _date_range(queryset, field, start=None, end=None):
+    if start:
+        queryset = queryset.filter(**{f'{field}__date__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{field}__date__lte': end})
+    return queryset
+
+
+def invoice_rows(start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """One row per invoice item; invoices without items get a single row"""
+    invoices = _date_range(Invoice.objects.order_by('id'), 'issued_at', start, end)
+    for invoice in invoices.prefetch_related('items').iterator(chunk_size=chunk_size):
+        base = [
+            invoice.invoice_number, invoice.issued_at, invoice.service_request_id, invoice.subtotal,
+            invoice.tax_amount, invoice.discount_amount, invoice.total_amount, invoice.payment_status,
+            invoice.payment_method, invoice.paid_amount, invoice.due_date, invoice.paid_at,
+        ]
+        items = invoice.items.all()
+        if not items:
+            yield base + [None, None, None, None]
+        for item in items:
+            yield base + [item.description, item.quantity, item.unit_price, item.total_price]
+
+
+def payment_rows(start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    payments = _date_range(Payment.objects.order_by('id'), 'created_at', start, end)
+    payments = payments.select_related('invoice', 'commission')
+    for payment in payments.iterator(chunk_size=chunk_size):
+        try:
+            commission = payment.commission
+        except Commission.DoesNotExist:
+            commission = None
+        yield [
+            payment.id, payment.invoice.invoice_number, payment.amount, payment.payment_method,
+            payment.payment_status, payment.transaction_id, payment.created_at, payment.processed_at,
+            commission and commission.id, commission and commission.commission_rate,
+            commission and commission.commission_amount, commission and commission.status,
+            commission and commission.service_provider_id,
+        ]
+
+
+def commission_rows(start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    commissions = _date_range(Commission.objects.order_by('id'), 'created_at', start, end)
+    commissions = commissions.select_related('service_provider', 'payment__invoice')
+    for commission in commissions.iterator(chunk_size=chunk_size):
+        yield [
+            commission.id, commission.service_provider_id, commission.service_provider.business_name,
+            commission.payment_id, commission.payment.invoice.invoice_number, commission.commission_rate,
+            commission.commission_amount, commission.status, commission.is_cash_payment,
+            commission.due_date, commission.paid_at, commission.created_at,
+        ]
+
+
+DATASETS = {
+    'invoices': (INVOICE_COLUMNS, invoice_rows),
+    'payments': (PAYMENT_COLUMNS, payment_rows),
+    'commissions': (COMMISSION_COLUMNS, commission_rows),
+}
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller"""
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def export_lines(dataset, export_format='csv', start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the export one line at a time"""
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset}")
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    columns, rows = DATASETS[dataset]
+
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows(start, end, chunk_size):
+            yield writer.writerow([_csv_value(value) for value in row])
+    else:
+        for row in rows(start, end, chunk_size):
+            yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
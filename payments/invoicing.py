@@ -0,0 +1,62 @@
+"""Build invoices with all their line items in one pass"""
+
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_EVEN
+from django.db import transaction
+from django.utils import timezone
+from .models import Invoice, InvoiceItem
+
+DEFAULT_DUE_DAYS = 7
+
+LineItem = namedtuple('LineItem', ['description', 'quantity', 'unit_price'])
+
+
+def quantize(value, model, field_name):
+    """Round value the way the model's DecimalField stores it"""
+    field = model._meta.get_field(field_name)
+    return Decimal(str(value)).quantize(Decimal(1).scaleb(-field.decimal_places), rounding=ROUND_HALF_EVEN)
+
+
+def compute_items(items):
+    """Return unsaved InvoiceItems with stored-precision totals, and their subtotal"""
+    invoice_items = []
+    subtotal = Decimal('0')
+    for item in items:
+        if not isinstance(item, LineItem):
+            item = LineItem(**item) if isinstance(item, dict) else LineItem(*item)
+        quantity = quantize(item.quantity, InvoiceItem, 'quantity')
+        unit_price = quantize(item.unit_price, InvoiceItem, 'unit_price')
+        # The same product InvoiceItem.save computes, rounded as the column stores it
+        total_price = quantize(quantity * unit_price, InvoiceItem, 'total_price')
+        invoice_items.append(InvoiceItem(
+            description=item.description, quantity=quantity,
+            unit_price=unit_price, total_price=total_price,
+        ))
+        subtotal += total_price
+    return invoice_items, subtotal
+
+
+def build_invoice(service_request, items, tax_amount=0, discount_amount=0, due_date=None, **fields):
+    """
+    Create an Invoice and all its items in one transaction. items are
+    LineItems, (description, quantity, unit_price) tuples or dicts.
+    """
+    invoice_items, subtotal = compute_items(items)
+    tax_amount = quantize(tax_amount, Invoice, 'tax_amount')
+    discount_amount = quantize(discount_amount, Invoice, 'discount_amount')
+
+    with transaction.atomic():
+        invoice = Invoice.objects.create(
+            service_request=service_request,
+            subtotal=quantize(subtotal, Invoice, 'subtotal'),
+            tax_amount=tax_amount,
+            discount_amount=discount_amount,
+            total_amount=quantize(subtotal + tax_amount - discount_amount, Invoice, 'total_amount'),
+            due_date=due_date or timezone.now() + timedelta(days=DEFAULT_DUE_DAYS),
+            **fields
+        )
+        for invoice_item in invoice_items:
+            invoice_item.invoice = invoice
+        InvoiceItem.objects.bulk_create(invoice_items)
+    return invoice
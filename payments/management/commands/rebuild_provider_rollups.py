@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from payments.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-provider daily rollups from payments, commissions and requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD)')
+
+    def _date(self, value):
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f'Invalid date: {value}')
+        return parsed
+
+    def handle(self, *args, **options):
+        rows = rebuild_rollups(self._date(options['start']), self._date(options['end']))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} provider rollup rows'))
@@ -0,0 +1,58 @@
+import threading
+import time
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from payments.models import InvoiceSequence
+
+
+class Command(BaseCommand):
+    help = 'Allocate invoice numbers from many threads at once and check that none repeat'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--per-thread', type=int, default=50)
+
+    def handle(self, *args, **options):
+        # A sentinel day keeps real invoice numbers untouched
+        day = date(1900, 1, 1)
+        InvoiceSequence.objects.filter(day=day).delete()
+        numbers = []
+        errors = []
+        lock = threading.Lock()
+        start_gate = threading.Barrier(options['threads'])
+
+        def worker():
+            allocated = []
+            try:
+                start_gate.wait()
+                for _ in range(options['per_thread']):
+                    allocated.append(InvoiceSequence.next_number(day))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+            with lock:
+                numbers.extend(allocated)
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        InvoiceSequence.objects.filter(day=day).delete()
+
+        expected = options['threads'] * options['per_thread']
+        duplicates = len(numbers) - len(set(numbers))
+        self.stdout.write(
+            f'{len(numbers)}/{expected} numbers in {elapsed:.2f}s '
+            f'({len(numbers) / elapsed:.0f}/s), {duplicates} duplicates, {len(errors)} errors'
+        )
+        if errors:
+            raise CommandError(f'Allocation failed: {errors[0]!r}')
+        if duplicates or len(numbers) != expected:
+            raise CommandError('Invoice numbers were not allocated uniquely')
+        if sorted(numbers) != list(range(1, expected + 1)):
+            raise CommandError('Invoice numbers left gaps')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from payments.overdue import sweep_overdue_commissions
+
+
+class Command(BaseCommand):
+    help = 'Mark every expired pending commission overdue and charge the providers (run every minute)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        result = sweep_overdue_commissions(batch_size=options['batch_size'])
+        self.stdout.write(
+            f'Marked {result.commissions} commissions overdue for {result.providers} providers '
+            f'in {result.elapsed * 1000:.1f} ms'
+        )
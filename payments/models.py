@@ -1,8 +1,45 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Length
 from django.utils import timezone
 from accounts.models import ServiceProviderProfile, CustomerProfile
 from bookings.models import ServiceRequest
 
+class InvoiceSequence(models.Model):
+    """Per-day invoice counter, handed out atomically by next_number()"""
+    day = models.DateField(unique=True)
+    last_number = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.day}: {self.last_number}"
+    
+    @classmethod
+    def next_number(cls, day):
+        with transaction.atomic():
+            # UPDATE first so the row lock is taken before anything is read
+            if not cls.objects.filter(day=day).update(last_number=F('last_number') + 1):
+                cls.objects.get_or_create(day=day, defaults={'last_number': cls.issued_on(day)})
+                cls.objects.filter(day=day).update(last_number=F('last_number') + 1)
+            return cls.objects.filter(day=day).values_list('last_number', flat=True).get()
+    
+    @staticmethod
+    def issued_on(day):
+        """
+        Highest number already issued on day, so a counter created mid-day
+        (invoices numbered before the sequence existed) carries on after it.
+        """
+        prefix = invoice_number_prefix(day)
+        latest = (
+            Invoice.objects.filter(invoice_number__startswith=prefix)
+            .order_by(Length('invoice_number').desc(), '-invoice_number')
+            .values_list('invoice_number', flat=True)
+            .first()
+        )
+        return int(latest[len(prefix):]) if latest else 0
+
+def invoice_number_prefix(day):
+    return f"INV-{day.strftime('%Y%m%d')}-"
+
 class Invoice(models.Model):
     PAYMENT_STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -47,11 +84,23 @@ class Invoice(models.Model):
     def remaining_amount(self):
         return self.total_amount - self.paid_amount
     
+    def recalculate_totals(self, save=True):
+        """Recompute subtotal and total_amount from the stored items with one aggregate"""
+        subtotal = self.items.aggregate(total=models.Sum('total_price'))['total'] or 0
+        self.subtotal = subtotal
+        self.total_amount = subtotal + self.tax_amount - self.discount_amount
+        if save:
+            self.save(update_fields=['subtotal', 'total_amount'])
+    
+    def save(self, *args, **kwargs):
+        self.generate_invoice_number()
+        super().save(*args, **kwargs)
+    
     def generate_invoice_number(self):
         if not self.invoice_number:
             today = timezone.now().date()
-            count = Invoice.objects.filter(issued_at__date=today).count() + 1
-            self.invoice_number = f"INV-{today.strftime('%Y%m%d')}-{count:04d}"
+            count = InvoiceSequence.next_number(today)
+            self.invoice_number = f"{invoice_number_prefix(today)}{count:04d}"
 
 class InvoiceItem(models.Model):
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='items')
@@ -115,11 +164,57 @@ class Commission(models.Model):
         return f"Commission for {self.service_provider.business_name} - ${self.commission_amount}"
     
     def mark_as_overdue(self):
+        from .overdue import sweep_overdue_commissions
+        
+        # Same set-based path as the batch sweeper, so dues are added with F()
         if self.status == 'pending' and timezone.now() > self.due_date:
-            self.status = 'overdue'
+            if sweep_overdue_commissions(Commission.objects.filter(pk=self.pk)).commissions:
+                self.status = 'overdue'
+                self.service_provider.refresh_from_db()
+    
+    def mark_as_paid(self):
+        from services.cache import bump_versions, version_cell
+        
+        with transaction.atomic():
+            # Go by the stored status, so two payments cannot both clear the dues
+            stored = Commission.objects.select_for_update().filter(pk=self.pk).values_list('status', flat=True).first()
+            if stored == 'paid':
+                self.status = 'paid'
+                return
+            self.status = 'paid'
+            self.paid_at = timezone.now()
             self.save()
             
-            # Update service provider's unpaid dues count
-            self.service_provider.unpaid_dues_count += 1
-            self.service_provider.total_unpaid_amount += self.commission_amount
-            self.service_provider.save()
\ No newline at end of file
+            # Clearing an overdue commission may make the provider eligible again.
+            # Same set-based UPDATE as the sweeper; a full save would overwrite
+            # the rating and ranking columns other writers keep with F()
+            if stored == 'overdue':
+                providers = ServiceProviderProfile.objects.filter(pk=self.service_provider_id)
+                providers.update(
+                    unpaid_dues_count=Greatest(F('unpaid_dues_count') - 1, Value(0)),
+                    total_unpaid_amount=Greatest(
+                        F('total_unpaid_amount') - self.commission_amount, Value(0),
+                        output_field=models.DecimalField(max_digits=10, decimal_places=2)
+                    ),
+                )
+                ServiceProviderProfile.refresh_eligibility(providers)
+                bump_versions(*[
+                    version_cell(geohash) for geohash in providers.values_list('user__geohash', flat=True)
+                ])
+
+class ProviderDailyRollup(models.Model):
+    """Per-provider daily totals, maintained incrementally by payments.rollups"""
+    service_provider = models.ForeignKey(ServiceProviderProfile, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    gross_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    commission_due = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    commission_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    commission_overdue = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    jobs_completed = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('service_provider', 'day')
+        ordering = ['-day']
+    
+    def __str__(self):
+        return f"{self.service_provider.business_name} - {self.day}"
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""Set-based sweeper that marks expired commissions overdue"""
+
+import time
+from collections import namedtuple
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+from accounts.metrics import adjust_metric, provider_pending_commissions_key
+from accounts.models import ServiceProviderProfile
+from services.cache import bump_versions, version_cell
+from .models import Commission
+from .rollups import move_commissions
+
+SweepResult = namedtuple('SweepResult', ['commissions', 'providers', 'elapsed'])
+
+
+def _sweep_batch(ids):
+    """
+    Mark one batch of commission ids overdue if still pending and charge
+    their providers. Returns (commissions moved, provider ids).
+    """
+    moved = Commission.objects.filter(id__in=ids, status='pending').update(status='overdue')
+    if moved < len(ids):
+        # Some were paid or swept since they were selected; charge only ours.
+        # Overdue rows are only written here, under the batch lock.
+        ids = list(Commission.objects.filter(id__in=ids, status='overdue').values_list('id', flat=True))
+    if not moved:
+        return 0, []
+    totals = list(
+        Commission.objects.filter(id__in=ids)
+        .values('service_provider_id')
+        .annotate(count=Count('id'), amount=Sum('commission_amount'))
+        .order_by()
+    )
+    move_commissions(ids, 'pending', 'overdue')
+
+    # One UPDATE adds every provider's aggregated dues
+    provider_ids = [row['service_provider_id'] for row in totals]
+    providers = ServiceProviderProfile.objects.filter(id__in=provider_ids)
+    providers.update(
+        unpaid_dues_count=F('unpaid_dues_count') + Case(
+            *[When(id=row['service_provider_id'], then=Value(row['count'])) for row in totals],
+            default=Value(0), output_field=IntegerField()
+        ),
+        total_unpaid_amount=F('total_unpaid_amount') + Case(
+            *[When(id=row['service_provider_id'], then=Value(row['amount'])) for row in totals],
+            default=Value(0), output_field=DecimalField(max_digits=10, decimal_places=2)
+        ),
+    )
+    ServiceProviderProfile.refresh_eligibility(providers)
+
+    # Queryset updates skip signals, so keep the counters and cache in step here
+    for row in totals:
+        adjust_metric(provider_pending_commissions_key(row['service_provider_id']), -row['count'])
+    bump_versions(*[
+        version_cell(geohash) for geohash in providers.values_list('user__geohash', flat=True)
+    ])
+    return moved, provider_ids
+
+
+def sweep_overdue_commissions(queryset=None, now=None, batch_size=1000):
+    """
+    Mark every pending commission past its due date overdue, in batches of
+    set-based UPDATEs. Returns a SweepResult with counts and elapsed seconds.
+    """
+    started = time.perf_counter()
+    now = now or timezone.now()
+    queryset = Commission.objects.all() if queryset is None else queryset
+    expired = queryset.filter(status='pending', due_date__lt=now)
+
+    swept = 0
+    providers = set()
+    while True:
+        with transaction.atomic():
+            # Lock the batch so a concurrent payment cannot clear it mid-sweep
+            ids = list(expired.select_for_update().order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            moved, provider_ids = _sweep_batch(ids)
+        swept += moved
+        providers.update(provider_ids)
+        if len(ids) < batch_size:
+            break
+
+    return SweepResult(swept, len(providers), time.perf_counter() - started)
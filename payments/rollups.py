@@ -0,0 +1,155 @@
+"""Incrementally maintained per-provider daily revenue and commission rollups"""
+
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from bookings.models import ServiceRequest
+from .models import Commission, Payment, ProviderDailyRollup
+
+COMMISSION_COLUMNS = {
+    'pending': 'commission_due',
+    'paid': 'commission_paid',
+    'overdue': 'commission_overdue',
+}
+ROLLUP_COLUMNS = ['gross_revenue', 'commission_due', 'commission_paid', 'commission_overdue', 'jobs_completed']
+
+
+def _day(value):
+    return timezone.localdate(value) if value else None
+
+
+def apply_deltas(deltas):
+    """Add {(provider_id, day): {column: delta}} to the rollup rows"""
+    with transaction.atomic():
+        for (provider_id, day), columns in deltas.items():
+            columns = {column: delta for column, delta in columns.items() if delta}
+            if not provider_id or not day or not columns:
+                continue
+            ProviderDailyRollup.objects.get_or_create(service_provider_id=provider_id, day=day)
+            ProviderDailyRollup.objects.filter(service_provider_id=provider_id, day=day).update(
+                **{column: F(column) + delta for column, delta in columns.items()}
+            )
+
+
+def record_change(before, after):
+    """Apply the difference between two contributions (either may be None)"""
+    record_changes([(before, after)])
+
+
+def record_changes(changes):
+    """Apply the differences of many (before, after) contribution pairs in one pass"""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for before, after in changes:
+        for contribution, sign in ((before, -1), (after, 1)):
+            if contribution:
+                key, columns = contribution
+                for column, value in columns.items():
+                    deltas[key][column] += sign * value
+    if deltas:
+        apply_deltas(deltas)
+
+
+# What a single row adds to the rollups, read back with the joins it needs
+
+def payment_contribution(payment_id):
+    row = Payment.objects.filter(pk=payment_id).values(
+        'payment_status', 'amount', 'created_at', 'processed_at',
+        provider_id=F('invoice__service_request__service_provider_id'),
+    ).first()
+    if not row or row['payment_status'] != 'completed':
+        return None
+    day = _day(row['processed_at'] or row['created_at'])
+    return (row['provider_id'], day), {'gross_revenue': row['amount']}
+
+
+def commission_contribution(commission):
+    column = COMMISSION_COLUMNS.get(commission.status)
+    if not column:
+        return None
+    return (commission.service_provider_id, _day(commission.created_at)), {column: commission.commission_amount}
+
+
+def job_contribution(service_request):
+    if service_request.status != 'completed':
+        return None
+    return (service_request.service_provider_id, _day(service_request.completed_at)), {'jobs_completed': 1}
+
+
+def move_commissions(ids, from_status, to_status):
+    """Shift the amounts of commissions changed with a queryset update"""
+    rows = (
+        Commission.objects.filter(id__in=ids)
+        .annotate(day=TruncDate('created_at'))
+        .values('service_provider_id', 'day')
+        .annotate(amount=Sum('commission_amount'))
+        .order_by()
+    )
+    deltas = {}
+    for row in rows:
+        deltas[(row['service_provider_id'], row['day'])] = {
+            COMMISSION_COLUMNS[from_status]: -row['amount'],
+            COMMISSION_COLUMNS[to_status]: row['amount'],
+        }
+    apply_deltas(deltas)
+
+
+def rebuild_rollups(start=None, end=None):
+    """Recompute the rollups from raw rows, optionally for a date range"""
+    totals = defaultdict(lambda: dict.fromkeys(ROLLUP_COLUMNS, 0))
+
+    def in_range(queryset, field):
+        queryset = queryset.annotate(day=TruncDate(field))
+        if start:
+            queryset = queryset.filter(day__gte=start)
+        if end:
+            queryset = queryset.filter(day__lte=end)
+        return queryset
+
+    # A payment counts on the day it was processed, or created if never processed
+    payments = in_range(
+        Payment.objects.filter(payment_status='completed'), Coalesce('processed_at', 'created_at')
+    ).values('invoice__service_request__service_provider_id', 'day').annotate(amount=Sum('amount')).order_by()
+    for row in payments:
+        key = (row['invoice__service_request__service_provider_id'], row['day'])
+        totals[key]['gross_revenue'] += row['amount']
+
+    commissions = in_range(Commission.objects.all(), 'created_at').values(
+        'service_provider_id', 'day', 'status'
+    ).annotate(amount=Sum('commission_amount')).order_by()
+    for row in commissions:
+        column = COMMISSION_COLUMNS.get(row['status'])
+        if column:
+            totals[(row['service_provider_id'], row['day'])][column] += row['amount']
+
+    jobs = in_range(ServiceRequest.objects.filter(status='completed'), 'completed_at').values(
+        'service_provider_id', 'day'
+    ).annotate(count=Count('id')).order_by()
+    for row in jobs:
+        totals[(row['service_provider_id'], row['day'])]['jobs_completed'] += row['count']
+
+    with transaction.atomic():
+        existing = ProviderDailyRollup.objects.all()
+        if start:
+            existing = existing.filter(day__gte=start)
+        if end:
+            existing = existing.filter(day__lte=end)
+        existing.delete()
+        ProviderDailyRollup.objects.bulk_create([
+            ProviderDailyRollup(service_provider_id=provider_id, day=day, **columns)
+            for (provider_id, day), columns in totals.items()
+            if provider_id and day
+        ], batch_size=1000)
+    return len(totals)
+
+
+def provider_summary(provider, start=None, end=None):
+    """Sum a provider's rollup rows over a date range"""
+    rows = ProviderDailyRollup.objects.filter(service_provider=provider)
+    if start:
+        rows = rows.filter(day__gte=start)
+    if end:
+        rows = rows.filter(day__lte=end)
+    summary = rows.aggregate(**{column: Sum(column) for column in ROLLUP_COLUMNS})
+    return {column: value or 0 for column, value in summary.items()}
@@ -0,0 +1,67 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from accounts.snapshots import stored_row
+from bookings.models import ServiceRequest
+from bookings.signals import status_changed, statuses_changed
+from .models import Commission, Payment
+from .rollups import (
+    commission_contribution, job_contribution, payment_contribution, record_change, record_changes,
+)
+
+
+@receiver(pre_save, sender=Payment)
+@receiver(pre_delete, sender=Payment)
+def remember_payment(sender, instance, **kwargs):
+    instance._rollup_before = payment_contribution(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Payment)
+def roll_up_payment(sender, instance, **kwargs):
+    record_change(getattr(instance, '_rollup_before', None), payment_contribution(instance.pk))
+
+
+@receiver(post_delete, sender=Payment)
+def unroll_payment(sender, instance, **kwargs):
+    record_change(getattr(instance, '_rollup_before', None), None)
+
+
+@receiver(pre_save, sender=Commission)
+def remember_commission(sender, instance, **kwargs):
+    stored = stored_row(instance)
+    instance._rollup_before = commission_contribution(stored) if stored else None
+
+
+@receiver(post_save, sender=Commission)
+def roll_up_commission(sender, instance, **kwargs):
+    record_change(getattr(instance, '_rollup_before', None), commission_contribution(instance))
+
+
+@receiver(post_delete, sender=Commission)
+def unroll_commission(sender, instance, **kwargs):
+    record_change(commission_contribution(instance), None)
+
+
+@receiver(pre_save, sender=ServiceRequest)
+def remember_job(sender, instance, **kwargs):
+    stored = stored_row(instance)
+    instance._rollup_before = job_contribution(stored) if stored else None
+
+
+@receiver(post_save, sender=ServiceRequest)
+def roll_up_job(sender, instance, **kwargs):
+    record_change(getattr(instance, '_rollup_before', None), job_contribution(instance))
+
+
+@receiver(post_delete, sender=ServiceRequest)
+def unroll_job(sender, instance, **kwargs):
+    record_change(job_contribution(instance), None)
+
+
+@receiver(status_changed, sender=ServiceRequest)
+def roll_up_transition(sender, instance, previous, **kwargs):
+    record_change(job_contribution(previous), job_contribution(instance))
+
+
+@receiver(statuses_changed, sender=ServiceRequest)
+def roll_up_transitions(sender, changes, **kwargs):
+    record_changes([(job_contribution(previous), job_contribution(instance)) for instance, previous in changes])
@@ -0,0 +1,86 @@
+import threading
+from datetime import date, timedelta
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from accounts.models import CustomerProfile, ServiceProviderProfile, User, Vehicle
+from bookings.models import ServiceRequest
+from payments.models import Invoice, InvoiceSequence, invoice_number_prefix
+from services.models import Service, ServiceCategory
+
+THREADS = 8
+PER_THREAD = 25
+
+
+class InvoiceNumberConcurrencyTests(TransactionTestCase):
+    """Numbers handed out from many threads at once are unique and gapless"""
+
+    def test_concurrent_allocation(self):
+        day = date(1900, 1, 1)
+        gate = threading.Barrier(THREADS)
+        lock = threading.Lock()
+        numbers, errors = [], []
+
+        def worker():
+            allocated = []
+            try:
+                gate.wait()
+                for _ in range(PER_THREAD):
+                    allocated.append(InvoiceSequence.next_number(day))
+            except Exception as exc:
+                errors.append(exc)
+                gate.abort()
+            finally:
+                connection.close()
+            with lock:
+                numbers.extend(allocated)
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(numbers), list(range(1, THREADS * PER_THREAD + 1)))
+
+
+class InvoiceSequenceSeedTests(TestCase):
+    """A counter created mid-day continues after the invoices already numbered that day"""
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', user_type='customer')
+        )
+        cls.vehicle = Vehicle.objects.create(
+            customer=customer, make='Make', model='Model', year=2020, vehicle_type='car', license_plate='INV-1',
+        )
+        provider = ServiceProviderProfile.objects.create(
+            user=User.objects.create(username='provider', user_type='service_provider'),
+            business_name='Garage', business_license='GAR', provider_type='mechanic', is_approved=True,
+        )
+        cls.service = Service.objects.create(
+            provider=provider, category=ServiceCategory.objects.create(name='Repairs'), name='Repair',
+            base_price=10, estimated_duration=timedelta(hours=1),
+        )
+
+    def invoice(self, invoice_number=''):
+        service_request = ServiceRequest.objects.create(
+            customer=self.vehicle.customer, service=self.service, vehicle=self.vehicle, description='Repair',
+            pickup_latitude=40.7, pickup_longitude=-74.0, pickup_address='Here',
+        )
+        return Invoice.objects.create(
+            service_request=service_request, invoice_number=invoice_number, subtotal=10, total_amount=10,
+            due_date=timezone.now() + timedelta(days=7),
+        )
+
+    def test_counter_starts_after_existing_invoices(self):
+        prefix = invoice_number_prefix(timezone.now().date())
+        for number in (1, 2, 9, 10):
+            self.invoice(f'{prefix}{number:04d}')
+        self.assertEqual(self.invoice().invoice_number, f'{prefix}0011')
+        self.assertEqual(self.invoice().invoice_number, f'{prefix}0012')
+
+    def test_counter_starts_at_one(self):
+        prefix = invoice_number_prefix(timezone.now().date())
+        self.assertEqual(self.invoice().invoice_number, f'{prefix}0001')
@@ -0,0 +1,29 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from .export import DATASETS, EXPORT_FORMATS, export_lines
+
+@login_required
+def export_view(request, dataset):
+    if request.user.user_type != 'admin' and not request.user.is_staff:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    export_format = request.GET.get('format', 'csv')
+    if dataset not in DATASETS or export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': 'Unknown dataset or format'}, status=400)
+    
+    try:
+        start = parse_date(request.GET.get('start', ''))
+        end = parse_date(request.GET.get('end', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date'}, status=400)
+    
+    # Rows are written as they are read, so memory stays flat for any range
+    content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(
+        export_lines(dataset, export_format, start, end),
+        content_type=content_type
+    )
+    extension = 'csv' if export_format == 'csv' else 'jsonl'
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{extension}"'
+    return response
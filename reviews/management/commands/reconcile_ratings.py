@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from reviews.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute every provider rating and aspect total from the approved reviews'
+
+    def handle(self, *args, **options):
+        count = rebuild_ratings()
+        self.stdout.write(f'Reconciled ratings for {count} providers')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from reviews.ranking import refresh_ranking_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute the Bayesian, time-decayed ranking score of every provider (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        result = refresh_ranking_scores(batch_size=options['batch_size'])
+        self.stdout.write(
+            f'Updated {result.changed} of {result.providers} provider scores '
+            f'(prior {result.prior:.3f}) in {result.elapsed:.2f} s'
+        )
@@ -35,4 +35,11 @@ class ReviewResponse(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
-        return f"Response to review {self.review.id}"
\ No newline at end of file
+        return f"Response to review {self.review.id}"
+class RankingPrior(models.Model):
+    """The platform-wide prior of the last ranking refresh, a single row written by reviews.ranking"""
+    value = models.FloatField()
+    refreshed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"Ranking prior {self.value:.3f} at {self.refreshed_at}"
@@ -0,0 +1,82 @@
+"""Batch-refreshed ranking scores for providers"""
+
+import time
+from collections import defaultdict, namedtuple
+from django.conf import settings
+from django.utils import timezone
+from accounts.models import ServiceProviderProfile
+from services.cache import bump_versions, version_cell
+from .models import RankingPrior, Review
+
+RankingResult = namedtuple('RankingResult', ['providers', 'changed', 'prior', 'elapsed'])
+
+
+def half_life_days():
+    return getattr(settings, 'RANKING_HALF_LIFE_DAYS', 180)
+
+
+def prior_weight():
+    return getattr(settings, 'RANKING_PRIOR_WEIGHT', 5)
+
+
+def decayed_totals(now=None):
+    """
+    Return ({provider_id: weighted rating sum}, {provider_id: weight}) over
+    approved reviews, a review's weight halving every RANKING_HALF_LIFE_DAYS.
+    """
+    now = now or timezone.now()
+    half_life = half_life_days() * 86400
+    sums, weights = defaultdict(float), defaultdict(float)
+    reviews = Review.objects.filter(is_approved=True).values_list('service_provider_id', 'rating', 'created_at')
+    for provider_id, rating, created_at in reviews.order_by().iterator(chunk_size=5000):
+        weight = 0.5 ** (max((now - created_at).total_seconds(), 0) / half_life)
+        sums[provider_id] += weight * rating
+        weights[provider_id] += weight
+    return sums, weights
+
+
+def bayesian_score(weighted_sum, weight, prior, strength):
+    """Mean rating pulled towards prior as if strength extra reviews rated it"""
+    return (strength * prior + weighted_sum) / (strength + weight) if strength + weight else prior
+
+
+def platform_prior(sums, weights):
+    """Platform-wide decayed mean rating, which providers are pulled towards"""
+    total_weight = sum(weights.values())
+    return sum(sums.values()) / total_weight if total_weight else 0.0
+
+
+def current_prior():
+    """
+    The prior of the last refresh, the score of a provider without reviews.
+    Before the first refresh every provider scores 0.
+    """
+    return RankingPrior.objects.values_list('value', flat=True).first() or 0.0
+
+
+def refresh_ranking_scores(now=None, batch_size=500):
+    """Recompute every provider's ranking_score and store the ones that changed"""
+    started = time.perf_counter()
+    sums, weights = decayed_totals(now)
+    prior = platform_prior(sums, weights)
+    RankingPrior.objects.update_or_create(pk=1, defaults={'value': round(prior, 6), 'refreshed_at': timezone.now()})
+    strength = prior_weight()
+
+    changed = []
+    providers = 0
+    for provider in ServiceProviderProfile.objects.only('pk', 'ranking_score').iterator(chunk_size=batch_size):
+        providers += 1
+        score = round(bayesian_score(sums.get(provider.pk, 0.0), weights.get(provider.pk, 0.0), prior, strength), 6)
+        if score != provider.ranking_score:
+            provider.ranking_score = score
+            changed.append(provider)
+
+    ServiceProviderProfile.objects.bulk_update(changed, ['ranking_score'], batch_size=batch_size)
+    # The nearby payload carries the score; bulk_update skips the invalidating signals
+    for start in range(0, len(changed), batch_size):
+        ids = [provider.pk for provider in changed[start:start + batch_size]]
+        bump_versions(*[
+            version_cell(geohash) for geohash in
+            ServiceProviderProfile.objects.filter(pk__in=ids).values_list('user__geohash', flat=True)
+        ])
+    return RankingResult(providers, len(changed), prior, time.perf_counter() - started)
@@ -0,0 +1,107 @@
+"""Incrementally maintained provider ratings"""
+
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from accounts.models import ServiceProviderProfile
+from services.cache import bump_versions, version_cell
+from .models import Review
+
+# Review field -> (sum column, count column) on ServiceProviderProfile
+ASPECTS = {
+    'rating': ('rating_sum', 'total_reviews'),
+    'quality_rating': ('quality_rating_sum', 'quality_rating_count'),
+    'timeliness_rating': ('timeliness_rating_sum', 'timeliness_rating_count'),
+    'professionalism_rating': ('professionalism_rating_sum', 'professionalism_rating_count'),
+    'value_rating': ('value_rating_sum', 'value_rating_count'),
+}
+REVIEW_FIELDS = ['service_provider_id', 'is_approved'] + list(ASPECTS)
+
+
+def contribution(values):
+    """(provider_id, {column: delta}) a review adds to the totals, or None"""
+    if not values or not values['is_approved']:
+        return None
+    columns = {}
+    for field, (sum_column, count_column) in ASPECTS.items():
+        if values[field] is not None:
+            columns[sum_column] = values[field]
+            columns[count_column] = 1
+    return values['service_provider_id'], columns
+
+
+def review_values(review):
+    return {field: getattr(review, field) for field in REVIEW_FIELDS}
+
+
+def _average(sum_column, count_column, sum_delta=0, count_delta=0):
+    return Coalesce(
+        Cast(F(sum_column) + sum_delta, FloatField()) / NullIf(F(count_column) + count_delta, 0),
+        Value(0.0), output_field=FloatField(),
+    )
+
+
+def apply_deltas(deltas):
+    """Add {provider_id: {column: delta}} to the provider rows, one UPDATE each"""
+    changed = []
+    with transaction.atomic():
+        for provider_id, columns in deltas.items():
+            columns = {column: delta for column, delta in columns.items() if delta}
+            if not provider_id or not columns:
+                continue
+            sum_columns = ASPECTS['rating']
+            updates = {column: F(column) + delta for column, delta in columns.items()}
+            updates['rating'] = _average(
+                *sum_columns, columns.get(sum_columns[0], 0), columns.get(sum_columns[1], 0)
+            )
+            ServiceProviderProfile.objects.filter(pk=provider_id).update(**updates)
+            changed.append(provider_id)
+
+    # The nearby payload carries the rating
+    if changed:
+        bump_versions(*[
+            version_cell(geohash) for geohash in ServiceProviderProfile.objects.filter(
+                pk__in=changed
+            ).values_list('user__geohash', flat=True)
+        ])
+
+
+def record_change(before, after):
+    """Apply the difference between two review states (either may be None)"""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for values, sign in ((before, -1), (after, 1)):
+        change = contribution(values)
+        if change:
+            provider_id, columns = change
+            for column, value in columns.items():
+                deltas[provider_id][column] += sign * value
+    apply_deltas(deltas)
+
+
+def rebuild_ratings(providers=None):
+    """Recompute every provider's totals from the approved reviews"""
+    providers = ServiceProviderProfile.objects.all() if providers is None else providers
+    aggregates = {}
+    for field, (sum_column, count_column) in ASPECTS.items():
+        aggregates[sum_column] = Coalesce(Sum(field), 0)
+        aggregates[count_column] = Count(field)
+    totals = {
+        row.pop('service_provider_id'): row
+        for row in Review.objects.filter(is_approved=True, service_provider__in=providers)
+        .values('service_provider_id').annotate(**aggregates).order_by()
+    }
+
+    columns = [column for pair in ASPECTS.values() for column in pair] + ['rating']
+    updated = []
+    for provider in providers.only('pk', *columns).iterator():
+        row = totals.get(provider.pk, {})
+        for sum_column, count_column in ASPECTS.values():
+            setattr(provider, sum_column, row.get(sum_column, 0))
+            setattr(provider, count_column, row.get(count_column, 0))
+        provider.rating = round(provider.rating_sum / provider.total_reviews, 2) if provider.total_reviews else 0
+        updated.append(provider)
+    ServiceProviderProfile.objects.bulk_update(updated, columns, batch_size=500)
+    # bulk_update skips the signals that invalidate cached nearby results
+    bump_versions(*[version_cell(geohash) for geohash in providers.values_list('user__geohash', flat=True)])
+    return len(updated)
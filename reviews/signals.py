@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from accounts.models import ServiceProviderProfile
+from .models import Review
+from .ranking import current_prior
+from .ratings import REVIEW_FIELDS, record_change, review_values
+
+
+@receiver(pre_save, sender=ServiceProviderProfile)
+def start_at_prior(sender, instance, **kwargs):
+    # Until the next refresh ranks them, new providers score like any provider without reviews
+    if instance._state.adding:
+        instance.ranking_score = current_prior()
+
+
+@receiver(pre_save, sender=Review)
+def remember_review(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = Review.objects.filter(pk=instance.pk).values(*REVIEW_FIELDS).first()
+
+
+@receiver(post_save, sender=Review)
+def rate_provider(sender, instance, **kwargs):
+    record_change(getattr(instance, '_previous_rating', None), review_values(instance))
+
+
+@receiver(post_delete, sender=Review)
+def unrate_provider(sender, instance, **kwargs):
+    record_change(review_values(instance), None)
@@ -0,0 +1,144 @@
+"""Tile-keyed result cache for nearby provider search"""
+
+import hashlib
+import math
+import time
+from django.conf import settings
+from django.core.cache import caches
+from .distance import batch_distances
+from .nearby import find_nearby_providers
+from .spatial import bounding_boxes, covering_cells, count_cells
+
+# Geohash length of the cells that carry a version counter (~39km x 19km)
+VERSION_PRECISION = 4
+# Queries spanning more version cells than this are not cached
+MAX_VERSION_CELLS = 16
+KM_PER_DEGREE = 111.32
+
+HITS_KEY = 'nearby:stats:hits'
+MISSES_KEY = 'nearby:stats:misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'NEARBY_CACHE_ALIAS', 'default')]
+
+
+def tile_size():
+    return getattr(settings, 'NEARBY_CACHE_TILE_DEGREES', 0.01)
+
+
+def quantize(latitude, longitude, radius_km):
+    """Snap a query to the center of its tile and round the radius up to a whole km"""
+    step = tile_size()
+    tile_lat = round(round(latitude / step) * step, 6)
+    tile_lng = round(round(longitude / step) * step, 6)
+    return tile_lat, tile_lng, max(int(math.ceil(radius_km)), 1)
+
+
+def version_key(cell):
+    return f'nearby:version:{cell}'
+
+
+def version_cell(geohash):
+    return geohash[:VERSION_PRECISION] if geohash else None
+
+
+def bump_versions(*cells):
+    """Invalidate every cached result that covers one of the version cells"""
+    cache = get_cache()
+    for cell in {cell for cell in cells if cell}:
+        key = version_key(cell)
+        # A fresh counter starts from the clock so an evicted one never repeats
+        cache.add(key, int(time.time() * 1000))
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000))
+
+
+def _versions(cells):
+    cache = get_cache()
+    keys = [version_key(cell) for cell in sorted(cells)]
+    versions = cache.get_many(keys)
+    now = int(time.time() * 1000)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, now)
+            versions[key] = cache.get(key, now)
+    return [versions[key] for key in keys]
+
+
+def _record(key):
+    cache = get_cache()
+    if not cache.add(key, 1):
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+
+def cache_stats():
+    cache = get_cache()
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = stats.get(HITS_KEY, 0)
+    misses = stats.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+        'tile_degrees': tile_size(),
+    }
+
+
+def reset_cache_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def cached_nearby_providers(namespace, latitude, longitude, radius_km, build):
+    """
+    Return build(provider) dicts for providers within radius_km, nearest
+    first, each with a 'distance' entry. build must include float
+    'latitude' and 'longitude' entries.
+
+    The candidate list is cached per (tile, radius) for a search radius
+    widened by the tile size, so exact distances are still measured from the
+    requested point.
+    """
+    tile_lat, tile_lng, tile_radius = quantize(latitude, longitude, radius_km)
+    search_radius = tile_radius + tile_size() * KM_PER_DEGREE
+
+    boxes = bounding_boxes(tile_lat, tile_lng, search_radius)
+    if count_cells(boxes, VERSION_PRECISION) > MAX_VERSION_CELLS:
+        entries = [build(provider) for provider, _ in find_nearby_providers(latitude, longitude, radius_km)]
+    else:
+        cells = covering_cells(boxes, VERSION_PRECISION)
+        # Hashed, as MAX_VERSION_CELLS raw counters can pass memcached's 250 character key limit
+        versions = '.'.join(str(version) for version in _versions(cells))
+        versions = hashlib.md5(versions.encode()).hexdigest()
+        key = f'nearby:{namespace}:{tile_lat}:{tile_lng}:{tile_radius}:{versions}'
+
+        cache = get_cache()
+        entries = cache.get(key)
+        if entries is None:
+            _record(MISSES_KEY)
+            entries = [
+                build(provider)
+                for provider, _ in find_nearby_providers(tile_lat, tile_lng, search_radius)
+            ]
+            cache.set(key, entries, getattr(settings, 'NEARBY_CACHE_TIMEOUT', 300))
+        else:
+            _record(HITS_KEY)
+
+    distances = batch_distances(
+        (latitude, longitude),
+        [entry['latitude'] for entry in entries],
+        [entry['longitude'] for entry in entries],
+    )
+    results = [
+        dict(entry, distance=round(distance, 2))
+        for entry, distance in zip(entries, distances.tolist())
+        if distance <= radius_km
+    ]
+    results.sort(key=lambda entry: entry['distance'])
+    return results
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Backends whose entries live in one process only
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_nearby_cache(app_configs, **kwargs):
+    alias = getattr(settings, 'NEARBY_CACHE_ALIAS', 'default')
+    if settings.CACHES.get(alias, {}).get('BACKEND') in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            f"NEARBY_CACHE_ALIAS '{alias}' is a per-process cache.",
+            hint='Version bumps from other workers and commands do not reach it, so results '
+                 'stay stale until they expire; point it at memcached or Redis.',
+            id='services.W001',
+        )]
+    return []
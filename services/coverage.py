@@ -0,0 +1,102 @@
+"""Precomputed ServiceArea coverage grid"""
+
+import math
+from django.db import transaction
+from .distance import batch_distances
+from .models import ServiceArea, ServiceAreaCell
+from .spatial import (
+    EARTH_MIN_RADIUS_KM, EARTH_RADIUS_KM, bounding_boxes, count_cells, covering_cells, encode_geohash,
+    geohash_bounds,
+)
+
+# Finest cells used for coverage (~4.9km x 4.9km); large areas use coarser cells
+COVERAGE_PRECISION = 5
+MAX_AREA_CELLS = 2048
+
+
+def _distance_to_cell_km(latitude, longitude, cell):
+    """Shortest distance from a point to a geohash cell, zero when inside it"""
+    min_lat, max_lat, min_lng, max_lng = geohash_bounds(cell)
+    nearest_lat = min(max(latitude, min_lat), max_lat)
+    nearest_lng = min(max(longitude, min_lng), max_lng)
+    lat1, lat2 = math.radians(latitude), math.radians(nearest_lat)
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin(math.radians(nearest_lng - longitude) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def area_cells(latitude, longitude, radius_km):
+    """Return the geohash cells that intersect a disc"""
+    boxes = bounding_boxes(latitude, longitude, radius_km)
+    precision = COVERAGE_PRECISION
+    while precision > 1 and count_cells(boxes, precision) > MAX_AREA_CELLS:
+        precision -= 1
+    # The spherical cell distance can overstate the geodesic one by this ratio
+    limit = radius_km * EARTH_RADIUS_KM / EARTH_MIN_RADIUS_KM
+    return [
+        cell for cell in covering_cells(boxes, precision)
+        if _distance_to_cell_km(latitude, longitude, cell) <= limit
+    ]
+
+
+def index_service_area(area):
+    """Replace the stored coverage cells of a ServiceArea"""
+    cells = area_cells(float(area.latitude), float(area.longitude), float(area.radius_km))
+    with transaction.atomic():
+        ServiceAreaCell.objects.filter(area=area).delete()
+        ServiceAreaCell.objects.bulk_create([
+            ServiceAreaCell(area=area, provider_id=area.provider_id, cell=cell)
+            for cell in cells
+        ])
+    return len(cells)
+
+
+def covering_areas(latitude, longitude, provider_ids=None):
+    """Return the ServiceAreas whose disc contains the point"""
+    geohash = encode_geohash(latitude, longitude, COVERAGE_PRECISION)
+    prefixes = [geohash[:length] for length in range(1, COVERAGE_PRECISION + 1)]
+    areas = ServiceArea.objects.filter(cells__cell__in=prefixes).distinct()
+    if provider_ids is not None:
+        areas = areas.filter(provider_id__in=provider_ids)
+    areas = list(areas)
+
+    # The grid is a superset; keep the areas that really contain the point
+    distances = batch_distances(
+        (latitude, longitude),
+        [area.latitude for area in areas],
+        [area.longitude for area in areas],
+    )
+    return [
+        area for area, distance in zip(areas, distances.tolist())
+        if distance <= float(area.radius_km)
+    ]
+
+
+def covering_provider_ids(latitude, longitude, provider_ids=None):
+    return {area.provider_id for area in covering_areas(latitude, longitude, provider_ids)}
+
+
+def annotate_coverage(results, latitude, longitude, build=None):
+    """
+    Set 'covers_location' on nearby results whose provider serves the point.
+    With build (as for cached_nearby_providers), providers whose service
+    area covers the point but who live outside the search radius are
+    appended as well.
+    """
+    from .nearby import nearby_providers_queryset
+
+    listed = {entry['id'] for entry in results}
+    covering = covering_provider_ids(latitude, longitude, None if build else listed)
+    missing = covering - listed
+    if build and missing:
+        providers = list(nearby_providers_queryset().filter(pk__in=missing))
+        distances = batch_distances(
+            (latitude, longitude),
+            [provider.user.latitude for provider in providers],
+            [provider.user.longitude for provider in providers],
+        )
+        for provider, distance in zip(providers, distances.tolist()):
+            results.append(dict(build(provider), distance=round(distance, 2)))
+    for entry in results:
+        entry['covers_location'] = entry['id'] in covering
+    return results
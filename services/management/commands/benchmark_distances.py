@@ -0,0 +1,49 @@
+import random
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from geopy.distance import geodesic
+from services.distance import batch_distances, DISTANCE_METHODS
+
+
+class Command(BaseCommand):
+    help = 'Compare the batched distance methods against a geopy geodesic loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=5000)
+        parser.add_argument('--spread', type=float, default=0.5, help='Degrees around the origin')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _best_of(self, repeat, func):
+        best = None
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        origin = (40.7128, -74.0060)
+        spread = options['spread']
+        latitudes = [origin[0] + rng.uniform(-spread, spread) for _ in range(options['points'])]
+        longitudes = [origin[1] + rng.uniform(-spread, spread) for _ in range(options['points'])]
+
+        baseline, expected = self._best_of(options['repeat'], lambda: [
+            geodesic(origin, (lat, lng)).kilometers for lat, lng in zip(latitudes, longitudes)
+        ])
+        expected = np.array(expected)
+        self.stdout.write(f"geopy loop: {baseline * 1000:.2f} ms for {options['points']} points")
+
+        for method in DISTANCE_METHODS:
+            elapsed, distances = self._best_of(
+                options['repeat'], lambda: batch_distances(origin, latitudes, longitudes, method)
+            )
+            max_error = float(np.max(np.abs(distances - expected))) if len(expected) else 0.0
+            self.stdout.write(
+                f"{method}: {elapsed * 1000:.2f} ms, {baseline / elapsed:.1f}x faster, "
+                f"max error {max_error * 1000:.3f} m"
+            )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from services.cache import cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the nearby search cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing')
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        self.stdout.write(
+            f"hits: {stats['hits']}  misses: {stats['misses']}  "
+            f"hit rate: {stats['hit_rate']:.1%}  tile: {stats['tile_degrees']} deg"
+        )
+        if options['reset']:
+            reset_cache_stats()
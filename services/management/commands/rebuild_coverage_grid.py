@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from services.coverage import index_service_area
+from services.models import ServiceArea
+
+
+class Command(BaseCommand):
+    help = 'Recompute the coverage grid cells of every service area'
+
+    def handle(self, *args, **options):
+        areas = 0
+        cells = 0
+        for area in ServiceArea.objects.iterator():
+            cells += index_service_area(area)
+            areas += 1
+        self.stdout.write(self.style.SUCCESS(f'Indexed {areas} service areas into {cells} cells'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from services.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of the service catalog'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} services with {type(backend).__name__}'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from accounts.models import User
+from services.spatial import encode_geohash
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored geohash of every user from their coordinates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch = []
+        updated = 0
+
+        users = User.objects.only('id', 'latitude', 'longitude', 'geohash')
+        for user in users.iterator(chunk_size=batch_size):
+            if user.latitude is not None and user.longitude is not None:
+                geohash = encode_geohash(float(user.latitude), float(user.longitude))
+            else:
+                geohash = ''
+            if geohash != user.geohash:
+                user.geohash = geohash
+                batch.append(user)
+            if len(batch) >= batch_size:
+                User.objects.bulk_update(batch, ['geohash'])
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            User.objects.bulk_update(batch, ['geohash'])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} geohashes'))
@@ -35,4 +35,18 @@ class ServiceArea(models.Model):
     radius_km = models.DecimalField(max_digits=6, decimal_places=2, default=5.0)
     
     def __str__(self):
-        return f"{self.provider.business_name} - {self.area_name}"
\ No newline at end of file
+        return f"{self.provider.business_name} - {self.area_name}"
+
+class ServiceAreaCell(models.Model):
+    """Geohash cell covered by a ServiceArea disc, maintained by services.coverage"""
+    area = models.ForeignKey(ServiceArea, on_delete=models.CASCADE, related_name='cells')
+    provider = models.ForeignKey(ServiceProviderProfile, on_delete=models.CASCADE, related_name='coverage_cells')
+    cell = models.CharField(max_length=12)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['cell', 'provider']),
+        ]
+    
+    def __str__(self):
+        return f"{self.area} - {self.cell}"
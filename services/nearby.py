@@ -0,0 +1,72 @@
+"""Shared provider lookup for the nearby services views"""
+
+from django.conf import settings
+from django.db.models import Prefetch
+from accounts.models import ServiceProviderProfile
+from .models import Service
+from .spatial import get_spatial_index
+from .distance import batch_distances
+
+
+def available_services_prefetch():
+    """Prefetch a provider's available services, with categories, into available_services"""
+    return Prefetch(
+        'services',
+        queryset=Service.objects.filter(is_available=True).select_related('category'),
+        to_attr='available_services',
+    )
+
+
+def nearby_providers_queryset():
+    return ServiceProviderProfile.objects.filter(
+        is_eligible_for_requests=True
+    ).exclude(
+        user__latitude__isnull=True, user__longitude__isnull=True
+    ).select_related('user').prefetch_related(available_services_prefetch())
+
+
+def find_nearby_providers(latitude, longitude, radius_km):
+    """
+    Return (provider, distance_km) pairs within radius_km, nearest first.
+    Runs a constant number of queries however many providers match.
+    """
+    # Only look at providers in the cells around the search radius
+    providers = get_spatial_index().filter(nearby_providers_queryset(), latitude, longitude, radius_km)
+    providers = list(providers)
+
+    # Measure every candidate in one vectorized pass
+    distances = batch_distances(
+        (latitude, longitude),
+        [provider.user.latitude for provider in providers],
+        [provider.user.longitude for provider in providers],
+    )
+
+    nearby = [
+        (provider, distance)
+        for provider, distance in zip(providers, distances.tolist())
+        if distance <= radius_km
+    ]
+    nearby.sort(key=lambda item: item[1])
+    return nearby
+
+
+def blend_key(entry):
+    """Ranking score discounted by distance: halved every NEARBY_BLEND_DISTANCE_KM"""
+    scale = getattr(settings, 'NEARBY_BLEND_DISTANCE_KM', 5.0)
+    return -entry.get('score', 0.0) / (1 + entry['distance'] / scale), entry['distance']
+
+
+NEARBY_ORDERINGS = {
+    'distance': lambda entry: entry['distance'],
+    # Providers whose service area contains the point first, then by distance
+    'coverage': lambda entry: (not entry.get('covers_location', False), entry['distance']),
+    # Precomputed ranking score (reviews.ranking), best first
+    'score': lambda entry: (-entry.get('score', 0.0), entry['distance']),
+    'blend': blend_key,
+}
+
+
+def order_results(results, order):
+    """Sort nearby result dicts by one of NEARBY_ORDERINGS, defaulting to distance"""
+    results.sort(key=NEARBY_ORDERINGS.get(order, NEARBY_ORDERINGS['distance']))
+    return results
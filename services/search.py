@@ -0,0 +1,226 @@
+"""Full-text search backends for the service catalog"""
+
+import re
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.module_loading import import_string
+from .models import Service
+
+SEARCH_RESULT_LIMIT = 500
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query.lower())
+
+
+def _order_by_ids(queryset, ids):
+    """Filter queryset to ids and keep their order"""
+    if not ids:
+        return queryset.none()
+    ranking = Case(
+        *[When(id=service_id, then=Value(position)) for position, service_id in enumerate(ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(id__in=ids).annotate(search_rank=ranking).order_by('search_rank')
+
+
+class SearchBackend:
+    """
+    Keeps a search index of services and answers catalog queries. search()
+    narrows a Service queryset to the matches, best match first.
+    """
+    def index_services(self, services):
+        pass
+
+    def remove_services(self, service_ids):
+        pass
+
+    def create_index(self):
+        """Create the index if it is missing; run at deploy time, not per request"""
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+
+class ContainsSearchBackend(SearchBackend):
+    """Unindexed icontains matching, for engines without full-text support"""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(provider__business_name__icontains=query)
+        )
+
+
+class IndexedSearchBackend(SearchBackend):
+    """Shared bookkeeping for backends that keep a side table keyed by service_id"""
+    table = 'services_service_search'
+    _ready = False
+
+    def create_table(self, cursor):
+        raise NotImplementedError
+
+    def insert_rows(self, cursor, rows):
+        raise NotImplementedError
+
+    def table_exists(self):
+        return self.table in connection.introspection.table_names()
+
+    def index_ready(self):
+        """
+        Whether the index table exists. Read-only: the table is created by
+        migrate or rebuild_search_index, never on the request path.
+        """
+        if not type(self)._ready:
+            type(self)._ready = self.table_exists()
+        return type(self)._ready
+
+    def create_index(self):
+        if not self.table_exists():
+            self.rebuild()
+
+    def _rows(self, services):
+        return [
+            (service.id, service.name, service.description, service.provider.business_name)
+            for service in services
+        ]
+
+    def index_services(self, services):
+        # Until the index exists there is nothing to keep in sync; creating it fills it
+        if not self.index_ready():
+            return
+        services = list(services)
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._delete(cursor, [service.id for service in services])
+            self.insert_rows(cursor, self._rows(services))
+
+    def remove_services(self, service_ids):
+        if not self.index_ready():
+            return
+        with connection.cursor() as cursor:
+            self._delete(cursor, list(service_ids))
+
+    def _delete(self, cursor, service_ids):
+        if service_ids:
+            placeholders = ', '.join(['%s'] * len(service_ids))
+            cursor.execute(f'DELETE FROM {self.table} WHERE service_id IN ({placeholders})', service_ids)
+
+    def rebuild(self):
+        count = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            self.create_table(cursor)
+            cursor.execute(f'DELETE FROM {self.table}')
+            batch = []
+            for service in Service.objects.select_related('provider').iterator(chunk_size=1000):
+                batch.append(service)
+                if len(batch) >= 1000:
+                    self.insert_rows(cursor, self._rows(batch))
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self.insert_rows(cursor, self._rows(batch))
+                count += len(batch)
+        return count
+
+    def match_ids(self, cursor, tokens, scope):
+        """Ids of the best SEARCH_RESULT_LIMIT matches among the services selected by (sql, params) scope"""
+        raise NotImplementedError
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset
+        if not self.index_ready():
+            return ContainsSearchBackend().search(queryset, query)
+        # Filter inside the match query so the limit applies to what is shown
+        scope = queryset.order_by().values('id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            ids = self.match_ids(cursor, tokens, scope)
+        return _order_by_ids(queryset, ids)
+
+
+class SQLiteFTS5SearchBackend(IndexedSearchBackend):
+    """SQLite FTS5 table ranked with bm25, with prefix indexes for as-you-type queries"""
+    table = 'services_service_fts'
+
+    def create_table(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            "service_id UNINDEXED, name, description, business_name, "
+            "prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def insert_rows(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {self.table} (service_id, name, description, business_name) VALUES (%s, %s, %s, %s)',
+            rows
+        )
+
+    def match_ids(self, cursor, tokens, scope):
+        # Every term must match; the last one also matches as a prefix
+        terms = [f'"{token}"' for token in tokens]
+        terms[-1] += '*'
+        scope_sql, scope_params = scope
+        # Name matches weigh more than business name, then description
+        cursor.execute(
+            f'SELECT service_id FROM {self.table} WHERE {self.table} MATCH %s AND service_id IN ({scope_sql}) '
+            f'ORDER BY bm25({self.table}, 0, 10.0, 1.0, 5.0) LIMIT %s',
+            [' '.join(terms), *scope_params, SEARCH_RESULT_LIMIT]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(IndexedSearchBackend):
+    """Weighted tsvector side table with a GIN index, ranked with ts_rank"""
+    table = 'services_service_search'
+
+    def create_table(self, cursor):
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {self.table} ('
+            'service_id bigint PRIMARY KEY, document tsvector NOT NULL)'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {self.table}_document_idx ON {self.table} USING GIN (document)'
+        )
+
+    def insert_rows(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {self.table} (service_id, document) VALUES (%s, '
+            "setweight(to_tsvector('simple', %s), 'A') || "
+            "setweight(to_tsvector('simple', %s), 'C') || "
+            "setweight(to_tsvector('simple', %s), 'B'))",
+            rows
+        )
+
+    def match_ids(self, cursor, tokens, scope):
+        terms = list(tokens)
+        terms[-1] += ':*'
+        scope_sql, scope_params = scope
+        cursor.execute(
+            f"SELECT service_id FROM {self.table}, to_tsquery('simple', %s) AS query "
+            f'WHERE document @@ query AND service_id IN ({scope_sql}) '
+            'ORDER BY ts_rank(document, query) DESC LIMIT %s',
+            [' & '.join(terms), *scope_params, SEARCH_RESULT_LIMIT]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTS5SearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    """Return the SERVICE_SEARCH_BACKEND, or the best backend for the database engine"""
+    backend = getattr(settings, 'SERVICE_SEARCH_BACKEND', None)
+    if backend:
+        return import_string(backend)()
+    return VENDOR_BACKENDS.get(connection.vendor, ContainsSearchBackend)()
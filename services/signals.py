@@ -0,0 +1,78 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+from accounts.models import User, ServiceProviderProfile
+from accounts.snapshots import stored_row
+from .models import Service, ServiceArea
+from .cache import bump_versions, version_cell
+from .coverage import index_service_area
+from .search import get_search_backend
+
+
+def _provider_cell(provider):
+    try:
+        return version_cell(provider.user.geohash)
+    except User.DoesNotExist:
+        return None
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_location(sender, instance, **kwargs):
+    instance._previous_geohash = None
+    if instance.pk and instance.user_type == 'service_provider':
+        stored = stored_row(instance)
+        instance._previous_geohash = stored.geohash if stored else None
+
+
+@receiver(post_save, sender=User)
+def invalidate_provider_location(sender, instance, **kwargs):
+    if instance.user_type != 'service_provider':
+        return
+    previous = getattr(instance, '_previous_geohash', None)
+    if previous != instance.geohash:
+        bump_versions(version_cell(previous), version_cell(instance.geohash))
+
+
+@receiver(post_save, sender=ServiceProviderProfile)
+@receiver(post_delete, sender=ServiceProviderProfile)
+def invalidate_provider(sender, instance, **kwargs):
+    bump_versions(_provider_cell(instance))
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_service(sender, instance, **kwargs):
+    try:
+        provider = instance.provider
+    except ServiceProviderProfile.DoesNotExist:
+        return
+    bump_versions(_provider_cell(provider))
+
+
+@receiver(post_save, sender=ServiceArea)
+def index_area_coverage(sender, instance, **kwargs):
+    index_service_area(instance)
+
+
+@receiver(post_migrate)
+def create_search_index(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    # The index is a raw side table with no migration of its own, so migrate creates it
+    if sender.label == 'services' and using == DEFAULT_DB_ALIAS:
+        get_search_backend().create_index()
+
+
+@receiver(post_save, sender=Service)
+def index_service_search(sender, instance, **kwargs):
+    get_search_backend().index_services([instance])
+
+
+@receiver(post_delete, sender=Service)
+def remove_service_search(sender, instance, **kwargs):
+    get_search_backend().remove_services([instance.id])
+
+
+@receiver(post_save, sender=ServiceProviderProfile)
+def index_provider_search(sender, instance, created, **kwargs):
+    # Services carry the provider's business name in the index
+    if not created:
+        get_search_backend().index_services(instance.services.select_related('provider'))
@@ -0,0 +1,210 @@
+"""Spatial index helpers for nearby provider search"""
+
+import math
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+EARTH_RADIUS_KM = 6371.0088
+# WGS-84 meridional radius of curvature at the equator, the smallest the
+# ellipsoid has; a degree is never shorter than this radius implies
+EARTH_MIN_RADIUS_KM = 6335.4393
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 12
+DEFAULT_SPATIAL_INDEX = 'services.spatial.GeohashIndex'
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bit = 0
+    char_index = 0
+    even = True
+
+    while len(chars) < precision:
+        bounds, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            char_index = (char_index << 1) | 1
+            bounds[0] = mid
+        else:
+            char_index = char_index << 1
+            bounds[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(GEOHASH_ALPHABET[char_index])
+            bit = 0
+            char_index = 0
+
+    return ''.join(chars)
+
+
+def geohash_bounds(geohash):
+    """Return the (min_lat, max_lat, min_lng, max_lng) box of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        char_index = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            bounds = lng_range if even else lat_range
+            mid = (bounds[0] + bounds[1]) / 2
+            if (char_index >> shift) & 1:
+                bounds[0] = mid
+            else:
+                bounds[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+
+def cell_size(precision):
+    """Return the (lat, lng) size in degrees of a geohash cell"""
+    bits = 5 * precision
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def bounding_boxes(latitude, longitude, radius_km):
+    """
+    Return the (min_lat, max_lat, min_lng, max_lng) boxes enclosing a radius.
+    A box crossing the antimeridian is split in two. The box is sized on
+    the smallest radius of the WGS-84 ellipsoid, so it also holds every
+    point within radius_km by geodesic distance.
+    """
+    angle = radius_km / EARTH_MIN_RADIUS_KM
+    delta_lat = math.degrees(angle)
+    min_lat = max(latitude - delta_lat, -90.0)
+    max_lat = min(latitude + delta_lat, 90.0)
+
+    # Near the poles the circle covers every longitude
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+
+    # The circle is widest in longitude slightly poleward of its centre
+    spread = math.sin(angle) / math.cos(math.radians(latitude))
+    if spread >= 1.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    delta_lng = math.degrees(math.asin(spread))
+
+    min_lng = longitude - delta_lng
+    max_lng = longitude + delta_lng
+    if min_lng < -180.0:
+        return [(min_lat, max_lat, min_lng + 360.0, 180.0), (min_lat, max_lat, -180.0, max_lng)]
+    if max_lng > 180.0:
+        return [(min_lat, max_lat, min_lng, 180.0), (min_lat, max_lat, -180.0, max_lng - 360.0)]
+    return [(min_lat, max_lat, min_lng, max_lng)]
+
+
+def _cell_span(low, high, origin, step, limit):
+    first = int((low - origin) // step)
+    last = min(int((high - origin) // step), limit - 1)
+    return range(first, last + 1)
+
+
+def covering_cells(boxes, precision):
+    """Return the geohash cells of the given precision that cover the boxes"""
+    lat_step, lng_step = cell_size(precision)
+    lat_cells = int(round(180.0 / lat_step))
+    lng_cells = int(round(360.0 / lng_step))
+
+    cells = set()
+    for min_lat, max_lat, min_lng, max_lng in boxes:
+        for row in _cell_span(min_lat, max_lat, -90.0, lat_step, lat_cells):
+            center_lat = -90.0 + (row + 0.5) * lat_step
+            for col in _cell_span(min_lng, max_lng, -180.0, lng_step, lng_cells):
+                center_lng = -180.0 + (col + 0.5) * lng_step
+                cells.add(encode_geohash(center_lat, center_lng, precision))
+    return cells
+
+
+def count_cells(boxes, precision):
+    lat_step, lng_step = cell_size(precision)
+    lat_cells = int(round(180.0 / lat_step))
+    lng_cells = int(round(360.0 / lng_step))
+    return sum(
+        len(_cell_span(min_lat, max_lat, -90.0, lat_step, lat_cells)) *
+        len(_cell_span(min_lng, max_lng, -180.0, lng_step, lng_cells))
+        for min_lat, max_lat, min_lng, max_lng in boxes
+    )
+
+
+def _to_decimal(value):
+    return Decimal(value).quantize(Decimal('0.000001'))
+
+
+class SpatialIndex:
+    """
+    Base class for spatial indexes. An index narrows a queryset down to the
+    rows that may lie within a radius; exact distances are left to the caller.
+    """
+    def __init__(self, lat_field='user__latitude', lng_field='user__longitude', geohash_field='user__geohash'):
+        self.lat_field = lat_field
+        self.lng_field = lng_field
+        self.geohash_field = geohash_field
+
+    def filter(self, queryset, latitude, longitude, radius_km):
+        raise NotImplementedError
+
+
+class BoundingBoxIndex(SpatialIndex):
+    """Prefilter on the indexed latitude/longitude columns with a bounding box"""
+
+    def bounding_box_q(self, boxes):
+        condition = Q()
+        for min_lat, max_lat, min_lng, max_lng in boxes:
+            condition |= Q(**{
+                f'{self.lat_field}__gte': _to_decimal(min_lat),
+                f'{self.lat_field}__lte': _to_decimal(max_lat),
+                f'{self.lng_field}__gte': _to_decimal(min_lng),
+                f'{self.lng_field}__lte': _to_decimal(max_lng),
+            })
+        return condition
+
+    def filter(self, queryset, latitude, longitude, radius_km):
+        boxes = bounding_boxes(latitude, longitude, radius_km)
+        return queryset.filter(self.bounding_box_q(boxes))
+
+
+class GeohashIndex(BoundingBoxIndex):
+    """
+    Grid-bucket index over the stored geohash. A radius query is turned into
+    the set of covering cells, each matched as an index range scan on the
+    geohash prefix, and then narrowed with the bounding box.
+    """
+    max_cells = 32
+    max_precision = 8
+
+    def cells_for(self, boxes):
+        for precision in range(self.max_precision, 0, -1):
+            if count_cells(boxes, precision) <= self.max_cells:
+                return covering_cells(boxes, precision)
+        return None
+
+    def cells_q(self, cells):
+        condition = Q()
+        for cell in sorted(cells):
+            # '~' sorts after every geohash character, so this is a prefix range
+            condition |= Q(**{
+                f'{self.geohash_field}__gte': cell,
+                f'{self.geohash_field}__lt': cell + '~',
+            })
+        return condition
+
+    def filter(self, queryset, latitude, longitude, radius_km):
+        boxes = bounding_boxes(latitude, longitude, radius_km)
+        queryset = queryset.filter(self.bounding_box_q(boxes))
+        cells = self.cells_for(boxes)
+        if cells:
+            queryset = queryset.filter(self.cells_q(cells))
+        return queryset
+
+
+def get_spatial_index(**kwargs):
+    """Instantiate the spatial index configured by SPATIAL_INDEX_BACKEND"""
+    backend = getattr(settings, 'SPATIAL_INDEX_BACKEND', DEFAULT_SPATIAL_INDEX)
+    return import_string(backend)(**kwargs)
@@ -0,0 +1,111 @@
+from datetime import timedelta
+from unittest import skipUnless
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from accounts.models import ServiceProviderProfile, User
+from services.distance import vincenty_km
+from services.models import Service, ServiceCategory
+from services.nearby import find_nearby_providers
+from services.search import SQLiteFTS5SearchBackend, get_search_backend
+from services.spatial import bounding_boxes
+
+ORIGIN = (0.0, 30.0)
+RADIUS_KM = 10.0
+
+
+def offset_to(distance_km, north):
+    """Degrees due north or east of ORIGIN at distance_km by geodesic distance"""
+    low, high = 0.0, 1.0
+    for _ in range(60):
+        middle = (low + high) / 2
+        point = (ORIGIN[0] + middle, ORIGIN[1]) if north else (ORIGIN[0], ORIGIN[1] + middle)
+        if vincenty_km(ORIGIN, [point[0]], [point[1]])[0] < distance_km:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+class BoundingBoxTests(SimpleTestCase):
+    """The prefilter box must hold every point within the radius by geodesic distance"""
+
+    def test_box_reaches_the_geodesic_radius(self):
+        (min_lat, max_lat, min_lng, max_lng), = bounding_boxes(*ORIGIN, RADIUS_KM)
+        self.assertGreaterEqual(max_lat, ORIGIN[0] + offset_to(RADIUS_KM, north=True))
+        self.assertLessEqual(min_lat, ORIGIN[0] - offset_to(RADIUS_KM, north=True))
+        self.assertGreaterEqual(max_lng, ORIGIN[1] + offset_to(RADIUS_KM, north=False))
+        self.assertLessEqual(min_lng, ORIGIN[1] - offset_to(RADIUS_KM, north=False))
+
+
+class NearbyBoundaryTests(TestCase):
+    """Providers just inside the radius are found, due north and due east"""
+
+    def add_provider(self, name, latitude, longitude):
+        user = User.objects.create(
+            username=name, user_type='service_provider', latitude=round(latitude, 6), longitude=round(longitude, 6),
+        )
+        provider = ServiceProviderProfile.objects.create(
+            user=user, business_name=name, business_license=name, provider_type='mechanic', is_approved=True,
+        )
+        Service.objects.create(
+            provider=provider, category=self.category, name='Repair', base_price=10,
+            estimated_duration=timedelta(hours=1),
+        )
+        return provider
+
+    def setUp(self):
+        self.category = ServiceCategory.objects.create(name='Repairs')
+
+    def test_providers_on_the_rim_are_found(self):
+        north = self.add_provider('north', ORIGIN[0] + offset_to(9.99, north=True), ORIGIN[1])
+        east = self.add_provider('east', ORIGIN[0], ORIGIN[1] + offset_to(9.99, north=False))
+        outside = self.add_provider('outside', ORIGIN[0] + offset_to(10.01, north=True), ORIGIN[1])
+
+        found = {provider.pk: distance for provider, distance in find_nearby_providers(*ORIGIN, RADIUS_KM)}
+        self.assertEqual(set(found), {north.pk, east.pk})
+        self.assertNotIn(outside.pk, found)
+        self.assertTrue(all(9.98 < distance <= RADIUS_KM for distance in found.values()))
+
+
+class MissingIndexBackend(SQLiteFTS5SearchBackend):
+    table = 'services_missing_fts'
+    _ready = False
+
+
+@skipUnless(connection.vendor == 'sqlite', 'exercises the SQLite FTS5 backend')
+class SearchIndexTests(TestCase):
+    """migrate creates the index; saving and searching never run DDL"""
+
+    def setUp(self):
+        user = User.objects.create(username='garage', user_type='service_provider')
+        self.provider = ServiceProviderProfile.objects.create(
+            user=user, business_name='Corner Garage', business_license='CG', provider_type='mechanic',
+        )
+        self.category = ServiceCategory.objects.create(name='Repairs')
+
+    def add_service(self, name):
+        return Service.objects.create(
+            provider=self.provider, category=self.category, name=name, base_price=10,
+            estimated_duration=timedelta(hours=1),
+        )
+
+    def ddl(self, queries):
+        return [query['sql'] for query in queries if query['sql'].lstrip().upper().startswith('CREATE')]
+
+    def test_index_is_kept_without_ddl(self):
+        with CaptureQueriesContext(connection) as queries:
+            service = self.add_service('Brake pads')
+            found = list(get_search_backend().search(Service.objects.all(), 'brak'))
+        self.assertEqual(found, [service])
+        self.assertEqual(self.ddl(queries.captured_queries), [])
+
+    def test_missing_index_falls_back_to_contains(self):
+        service = self.add_service('Brake pads')
+        backend = MissingIndexBackend()
+        with CaptureQueriesContext(connection) as queries:
+            backend.index_services([service])
+            found = list(backend.search(Service.objects.all(), 'brake'))
+        self.assertEqual(found, [service])
+        self.assertEqual(self.ddl(queries.captured_queries), [])
+        self.assertFalse(backend.table_exists())
@@ -2,9 +2,11 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
-from django.db.models import Q, Avg
-from geopy.distance import geodesic
 from .models import Service, ServiceCategory, ServiceArea
+from .cache import cached_nearby_providers
+from .coverage import annotate_coverage
+from .nearby import order_results
+from .search import get_search_backend
 from accounts.models import ServiceProviderProfile
 from reviews.models import Review
 import json
@@ -13,20 +15,16 @@ def service_list_view(request):
     categories = ServiceCategory.objects.filter(is_active=True)
     services = Service.objects.filter(is_available=True).select_related('provider', 'category')
     
-    # Search functionality
-    search_query = request.GET.get('search', '')
-    if search_query:
-        services = services.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(provider__business_name__icontains=search_query)
-        )
-    
-    # Category filter
+    # Category filter, ahead of the search so its result limit applies within the category
     category_id = request.GET.get('category')
     if category_id:
         services = services.filter(category_id=category_id)
     
+    # Search functionality
+    search_query = request.GET.get('search', '')
+    if search_query:
+        services = get_search_backend().search(services, search_query)
+    
     context = {
         'services': services,
         'categories': categories,
@@ -36,53 +34,41 @@ def service_list_view(request):
     
     return render(request, 'services/list.html', context)
 
+def _nearby_provider_data(provider):
+    return {
+        'id': provider.id,
+        'business_name': provider.business_name,
+        'provider_type': provider.get_provider_type_display(),
+        'rating': float(provider.rating),
+        'score': provider.ranking_score,
+        'latitude': float(provider.user.latitude),
+        'longitude': float(provider.user.longitude),
+        'services': [
+            {
+                'id': service.id,
+                'name': service.name,
+                'base_price': float(service.base_price),
+                'category': service.category.name
+            }
+            for service in provider.available_services
+        ]
+    }
+
 def nearby_services_view(request):
     # Get user location from request
     user_lat = request.GET.get('lat')
     user_lng = request.GET.get('lng')
     radius = float(request.GET.get('radius', 10))  # Default 10km radius
+    order = request.GET.get('order', 'distance')  # 'distance', 'coverage', 'score' or 'blend'
     
     if not user_lat or not user_lng:
         return JsonResponse({'error': 'Location required'}, status=400)
     
     user_lat, user_lng = float(user_lat), float(user_lng)
-    user_location = (user_lat, user_lng)
-    
-    # Get all service providers with their locations
-    providers = ServiceProviderProfile.objects.filter(
-        is_approved=True,
-        is_active=True,
-        is_eligible_for_requests=True
-    ).exclude(user__latitude__isnull=True, user__longitude__isnull=True)
-    
-    nearby_providers = []
-    for provider in providers:
-        provider_location = (float(provider.user.latitude), float(provider.user.longitude))
-        distance = geodesic(user_location, provider_location).kilometers
-        
-        if distance <= radius:
-            provider_data = {
-                'id': provider.id,
-                'business_name': provider.business_name,
-                'provider_type': provider.get_provider_type_display(),
-                'rating': float(provider.rating),
-                'distance': round(distance, 2),
-                'latitude': float(provider.user.latitude),
-                'longitude': float(provider.user.longitude),
-                'services': [
-                    {
-                        'id': service.id,
-                        'name': service.name,
-                        'base_price': float(service.base_price),
-                        'category': service.category.name
-                    }
-                    for service in provider.services.filter(is_available=True)
-                ]
-            }
-            nearby_providers.append(provider_data)
     
-    # Sort by distance
-    nearby_providers.sort(key=lambda x: x['distance'])
+    nearby_providers = cached_nearby_providers('html', user_lat, user_lng, radius, _nearby_provider_data)
+    annotate_coverage(nearby_providers, user_lat, user_lng, _nearby_provider_data)
+    order_results(nearby_providers, order)
     
     if request.headers.get('Content-Type') == 'application/json':
         return JsonResponse({'providers': nearby_providers})
@@ -103,15 +89,10 @@ def services_by_category(request, category_id):
 def provider_detail_view(request, provider_id):
     provider = get_object_or_404(ServiceProviderProfile, id=provider_id, is_approved=True)
     services = provider.services.filter(is_available=True)
-    reviews = Review.objects.filter(service_provider=provider, is_approved=True)[:5]
-    
-    # Calculate average ratings
-    avg_ratings = reviews.aggregate(
-        avg_quality=Avg('quality_rating'),
-        avg_timeliness=Avg('timeliness_rating'),
-        avg_professionalism=Avg('professionalism_rating'),
-        avg_value=Avg('value_rating')
-    )
+    reviews = Review.objects.filter(service_provider=provider, is_approved=True).select_related('customer__user')[:5]
+    
+    # Averages over all approved reviews, kept on the provider row by reviews.ratings
+    avg_ratings = provider.aspect_averages()
     
     context = {
         'provider': provider,
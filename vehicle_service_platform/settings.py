@@ -15,6 +15,7 @@ ALLOWED_HOSTS = ['*']
 
 # Application definition
 INSTALLED_APPS = [
+    'daphne',  # ASGI runserver, so WebSockets work in development
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -30,6 +31,7 @@ INSTALLED_APPS = [
     'crispy_bootstrap4',
     'django_filters',
     'django_extensions',
+    'channels',
     
     # Local apps
     'accounts',
@@ -65,18 +67,23 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'notifications.context_processors.unread_notifications',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'vehicle_service_platform.wsgi.application'
+ASGI_APPLICATION = 'vehicle_service_platform.asgi.application'
 
 # Database
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than the in-memory default, so the threaded
+        # TransactionTestCases see the locking a real deployment does
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -150,4 +157,77 @@ GOOGLE_MAPS_API_KEY = config('GOOGLE_MAPS_API_KEY', default='')
 
 # Commission settings
 DEFAULT_COMMISSION_RATE = 0.10  # 10%
-MAX_UNPAID_DUES = 5
\ No newline at end of file
+MAX_UNPAID_DUES = 5
+
+# Nearby search spatial index ('services.spatial.BoundingBoxIndex' skips the geohash cells)
+SPATIAL_INDEX_BACKEND = 'services.spatial.GeohashIndex'
+
+# Nearby search distances: 'vincenty' matches geodesic, 'haversine' is faster (~0.5% error)
+NEARBY_DISTANCE_METHOD = 'vincenty'
+
+# Caches (LocMemCache evicts least recently used entries past MAX_ENTRIES).
+# LocMemCache is per process: with several workers or cron commands the
+# unread counters and nearby version counters need a shared backend such as
+# memcached or Redis (check --deploy warns otherwise)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'nearby': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'nearby-search',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Nearby search result cache
+NEARBY_CACHE_ALIAS = 'nearby'
+NEARBY_CACHE_TILE_DEGREES = 0.01  # ~1.1km tiles
+NEARBY_CACHE_TIMEOUT = 300
+
+# Service catalog search; by default SQLite uses FTS5 and PostgreSQL a tsvector index
+SERVICE_SEARCH_BACKEND = None
+
+# Dashboard counters older than this (seconds) are recounted live
+DASHBOARD_METRICS_MAX_AGE = 3600
+
+# Push gateways per device type, e.g. {'ios': {'BACKEND': 'path.to.Gateway', 'OPTIONS': {...}}}.
+# Device types left out get no pushes and their notifications stay unsent;
+# deliver_push_notifications --fake swaps in the local FakeGateway.
+PUSH_GATEWAYS = {}
+
+# Cached unread notification counters (seconds before a recount)
+NOTIFICATION_CACHE_ALIAS = 'default'
+NOTIFICATION_UNREAD_TIMEOUT = 3600
+
+# Chat WebSockets; the in-memory layer only reaches sockets in this process,
+# use channels_redis.core.RedisChannelLayer when running several workers
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
+
+# Provider ranking score: a review's weight halves every RANKING_HALF_LIFE_DAYS,
+# and RANKING_PRIOR_WEIGHT virtual reviews at the platform mean smooth small counts
+RANKING_HALF_LIFE_DAYS = 180
+RANKING_PRIOR_WEIGHT = 5
+# order=blend halves a provider's score at this distance
+NEARBY_BLEND_DISTANCE_KM = 5.0
+
+# Dispatch of new requests: the K nearest eligible providers within a radius
+# that doubles up to the maximum are ranked, then offered in waves
+DISPATCH_CANDIDATES = 20
+DISPATCH_INITIAL_RADIUS_KM = 5.0
+DISPATCH_MAX_RADIUS_KM = 50.0
+DISPATCH_MAX_ACTIVE_JOBS = 3
+DISPATCH_WEIGHTS = {'distance': 0.5, 'score': 0.3, 'load': 0.2}
+# Providers per wave, seconds before an offer lapses and seconds before
+# searching again once nobody is left to offer a request to, by priority
+DISPATCH_POLICIES = {
+    'emergency': {'wave_size': 5, 'timeout': 45, 'retry': 60},
+    'high': {'wave_size': 3, 'timeout': 90},
+    'medium': {'wave_size': 3, 'timeout': 180},
+    'low': {'wave_size': 2, 'timeout': 300},
+}